@@ -24,8 +24,11 @@ Or call run_demo() from a notebook.
 """
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import base64
+import hashlib
+import json
 import math
 import random
 import numpy as np
@@ -72,13 +75,74 @@ class Item:
 
 @dataclass
 class ItemBank:
+    """Items keyed by id, mirrored in struct-of-arrays NumPy columns.
+
+    Row ``i`` of ``a``, ``b`` and ``skill_codes`` describes ``ids[i]``; rows are
+    assigned in insertion order and never move, so per-session masks and
+    indexes can refer to items by row.  ``skill_rows`` lists the rows of each
+    skill, so per-skill lookups cost O(items in the skill).
+    """
     items: Dict[str, Item] = field(default_factory=dict)
+    ids: List[str] = field(default_factory=list, init=False, repr=False)
+    row_of: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    skill_vocab: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _a: np.ndarray = field(default_factory=lambda: np.zeros(16), init=False, repr=False)
+    _b: np.ndarray = field(default_factory=lambda: np.zeros(16), init=False, repr=False)
+    _skill: np.ndarray = field(default_factory=lambda: np.zeros(16, dtype=np.int32), init=False, repr=False)
+    revision: int = field(default=0, init=False, repr=False)  # bumped when an item is replaced
+    _skill_rows: Dict[int, List[int]] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self):
+        initial, self.items = self.items, {}
+        for item in initial.values():
+            self.add(item)
 
     def add(self, item: Item):
+        row = self.row_of.get(item.id)
+        code = self.skill_vocab.setdefault(item.skill, len(self.skill_vocab))
+        if row is not None:
+            self.revision += 1
+            if self._skill[row] != code:
+                self._skill_rows[int(self._skill[row])].remove(row)
+                self._skill_rows.setdefault(code, []).append(row)
+        else:
+            row = self.row_of[item.id] = len(self.ids)
+            self.ids.append(item.id)
+            if row == len(self._a):
+                # grow the columns geometrically so appends stay amortized O(1)
+                self._a = np.resize(self._a, 2 * row)
+                self._b = np.resize(self._b, 2 * row)
+                self._skill = np.resize(self._skill, 2 * row)
+            self._skill_rows.setdefault(code, []).append(row)
         self.items[item.id] = item
+        self._a[row] = item.a
+        self._b[row] = item.b
+        self._skill[row] = code
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def a(self) -> np.ndarray:
+        return self._a[:len(self.ids)]
+
+    @property
+    def b(self) -> np.ndarray:
+        return self._b[:len(self.ids)]
+
+    @property
+    def skill_codes(self) -> np.ndarray:
+        return self._skill[:len(self.ids)]
+
+    def item_at(self, row: int) -> Item:
+        return self.items[self.ids[row]]
+
+    def skill_rows(self, skill: str) -> np.ndarray:
+        code = self.skill_vocab.get(skill)
+        return np.array(self._skill_rows.get(code, ()), dtype=np.int64)
 
     def by_skill(self, skill: str) -> List[Item]:
-        return [it for it in self.items.values() if it.skill == skill]
+        return [self.item_at(row) for row in self._skill_rows.get(self.skill_vocab.get(skill), ())]
 
     def all(self) -> List[Item]:
         return list(self.items.values())
@@ -86,9 +150,31 @@ class ItemBank:
 
 @dataclass
 class CATConfig:
+    """Stopping rule, selection and estimation settings for :class:`CATEngine`.
+
+    Selection cost per pick: without ``info_index`` the bank is scored at
+    theta, O(bank), and a content-balanced pick (``skill_targets``) scores
+    the chosen skill's rows, O(items in the skill).  With ``info_index`` both
+    walk a precomputed :class:`ThetaGridIndex` list, O(items asked).  Set it
+    for large banks or large skills; theta is then snapped to the nearest
+    ``grid_step`` point unless ``grid_interpolate`` is set.
+    """
+
     max_items: int = 10
     se_stop: float = 0.35  # stop when SE(theta) below this
     start_theta: float = 0.0
+    info_index: bool = False  # select through a ThetaGridIndex instead of scoring the bank
+    grid_step: float = 0.25
+    grid_interpolate: bool = False
+    # "mle" (Newton-Raphson; no finite estimate while all responses are correct
+    # or all wrong), "eap" or "map" (quadrature posterior)
+    estimator: str = "mle"
+    prior_mean: float = 0.0
+    prior_sd: float = 1.0
+    quadrature_points: int = 61
+    # content balancing: target share of the test per skill (normalized);
+    # each item is drawn from the skill furthest below its target
+    skill_targets: Optional[Dict[str, float]] = None
 
 
 @dataclass
@@ -97,16 +183,202 @@ class CATState:
     responses: Dict[str, int] = field(default_factory=dict)  # 1 correct, 0 wrong
     theta: float = 0.0
     se: float = float("inf")
+    asked_mask: Optional[np.ndarray] = field(default=None, repr=False)  # bank row -> asked
+    log_posterior: Optional[np.ndarray] = field(default=None, repr=False)  # at quadrature nodes
+    opening_node: int = 0  # position in the engine's OpeningTree; -1 once past it
+    pending: Optional[str] = None  # item handed out by CATEngine.next_item, awaiting submit
+
+    def record(self, item: Item, correct: int, row: int):
+        self.asked.append(item.id)
+        self.responses[item.id] = correct
+        if self.asked_mask is not None:
+            self.asked_mask[row] = True
+
+    def to_dict(self, bank: ItemBank) -> Dict[str, Any]:
+        """Compact JSON-ready form for storing a session between requests.
+
+        Asked items are stored as bank rows in asking order, with one response
+        bit per asked item (base64); the quadrature posterior is not stored,
+        the engine rebuilds it from the responses on the next submit.
+        """
+        order = [bank.row_of[iid] for iid in self.asked]
+        correct = np.array([bool(self.responses[iid]) for iid in self.asked], dtype=bool)
+        return {
+            "size": len(bank),
+            "order": order,
+            "correct": base64.b64encode(np.packbits(correct).tobytes()).decode("ascii"),
+            "theta": self.theta,
+            "se": None if math.isinf(self.se) else self.se,
+            "opening_node": self.opening_node,
+            "pending": bank.row_of[self.pending] if self.pending is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], bank: ItemBank) -> "CATState":
+        size, order = data["size"], data["order"]
+        if size > len(bank):
+            raise ValueError(f"Session refers to {size} items but the bank has {len(bank)}")
+        if len(set(order)) != len(order) or any(not 0 <= row < size for row in order):
+            raise ValueError("Session asking order has repeated or unknown items")
+        pending = data["pending"]
+        if pending is not None and (not 0 <= pending < size or pending in order):
+            raise ValueError("Session pending item is unknown or already answered")
+        packed = np.frombuffer(base64.b64decode(data["correct"]), dtype=np.uint8)
+        correct = np.unpackbits(packed, count=len(order)).astype(bool)
+        asked_mask = np.zeros(len(bank), dtype=bool)
+        asked_mask[order] = True
+        asked = [bank.ids[row] for row in order]
+        return cls(
+            asked=asked,
+            responses={iid: int(u) for iid, u in zip(asked, correct)},
+            theta=data["theta"],
+            se=float("inf") if data["se"] is None else data["se"],
+            asked_mask=asked_mask,
+            opening_node=data["opening_node"],
+            pending=bank.ids[pending] if pending is not None else None,
+        )
+
+
+class ThetaGridIndex:
+    """Bank rows ranked by Fisher information at fixed theta grid points.
+
+    A lookup snaps theta to the nearest grid point and walks that point's list
+    past asked items.  The first unasked item is always within the first
+    ``len(asked) + 1`` entries, so selection is O(asked) instead of O(bank).
+    With ``interpolate=True`` the heads of the two grid points bracketing theta
+    are merged and re-scored exactly at theta.
+
+    Items appended to the bank since the last lookup are merged into every
+    list by binary search; replacing an existing item triggers a full rebuild.
+    Per-skill lists (``skill_order``) are built lazily from the bank's skill
+    index and dropped whenever the bank changes.
+    """
+
+    def __init__(
+        self,
+        bank: ItemBank,
+        *,
+        lo: float = -4.0,
+        hi: float = 4.0,
+        step: float = 0.25,
+        interpolate: bool = False,
+        candidates: int = 8,
+    ):
+        self.bank = bank
+        self.grid = np.arange(lo, hi + step / 2, step)
+        self.step = step
+        self.interpolate = interpolate
+        self.candidates = candidates
+        self._order = np.zeros((len(self.grid), 0), dtype=np.int32)
+        self._info = np.zeros((len(self.grid), 0), dtype=np.float32)
+        self._skill_order: Dict[int, np.ndarray] = {}
+        self._revision = bank.revision
+        self.refresh()
+
+    def _grid_information(self, rows: np.ndarray) -> np.ndarray:
+        a = self.bank.a[rows]
+        p = 1.0 / (1.0 + np.exp(-a * (self.grid[:, None] - self.bank.b[rows])))
+        return a * a * p * (1 - p)
+
+    def refresh(self):
+        """Bring the index up to date with the bank."""
+        size = self._order.shape[1]
+        if self._revision != self.bank.revision or size > len(self.bank):
+            size = 0
+            self._order = self._order[:, :0]
+            self._info = self._info[:, :0]
+            self._revision = self.bank.revision
+        if size == len(self.bank):
+            return
+        self._skill_order.clear()
+        rows = np.arange(size, len(self.bank))
+        info = self._grid_information(rows).astype(np.float32)
+        order = np.argsort(-info, axis=1, kind="stable")
+        new_rows = rows[order].astype(np.int32)
+        new_info = np.take_along_axis(info, order, axis=1)
+        if not size:
+            self._order, self._info = new_rows, new_info
+            return
+        merged_order = np.empty((len(self.grid), len(self.bank)), dtype=np.int32)
+        merged_info = np.empty_like(merged_order, dtype=np.float32)
+        for g in range(len(self.grid)):
+            # side="right" keeps older rows ahead of equally informative new ones
+            at = np.searchsorted(-self._info[g], -new_info[g], side="right")
+            merged_order[g] = np.insert(self._order[g], at, new_rows[g])
+            merged_info[g] = np.insert(self._info[g], at, new_info[g])
+        self._order, self._info = merged_order, merged_info
+
+    def skill_order(self, code: int) -> np.ndarray:
+        """Rows of skill *code* ranked by information at each grid point."""
+        self.refresh()
+        order = self._skill_order.get(code)
+        if order is None:
+            rows = np.sort(np.array(self.bank._skill_rows.get(code, ()), dtype=np.int64))
+            info = self._grid_information(rows).astype(np.float32)
+            order = self._skill_order[code] = rows[np.argsort(-info, axis=1, kind="stable")].astype(np.int32)
+        return order
+
+    def select(
+        self,
+        theta: float,
+        asked_mask: np.ndarray,
+        n_asked: int,
+        skill: Optional[int] = None,
+    ) -> Optional[int]:
+        """Return the most informative unasked row near *theta*, or ``None``.
+
+        With *skill* (a skill code) only that skill's rows are considered and
+        *n_asked* counts the asked items of that skill.
+        """
+        self.refresh()
+        order = self.skill_order(skill) if skill is not None else self._order
+        if n_asked >= order.shape[1]:
+            return None
+        position = (theta - self.grid[0]) / self.step
+        if not self.interpolate:
+            g = int(np.clip(round(position), 0, len(self.grid) - 1))
+            head = order[g, :n_asked + 1]
+            return int(head[~asked_mask[head]][0])
+        g0 = int(np.clip(math.floor(position), 0, len(self.grid) - 1))
+        g1 = min(g0 + 1, len(self.grid) - 1)
+        depth = n_asked + self.candidates
+        head = np.concatenate([order[g0, :depth], order[g1, :depth]])
+        rows = np.unique(head[~asked_mask[head]])
+        a = self.bank.a[rows]
+        p = 1.0 / (1.0 + np.exp(-a * (theta - self.bank.b[rows])))
+        return int(rows[np.argmax(a * a * p * (1 - p))])
 
 
 class CATEngine:
     """Very small 2PL CAT: item selection via Fisher information at current theta,
-    ability update via 2PL MLE with Newton-Raphson.
+    ability update via 2PL MLE with Newton-Raphson, or via EAP/MAP on a
+    posterior kept at fixed quadrature nodes (``config.estimator``).
+
+    Selection evaluates the information of the whole bank as one array
+    expression over the bank columns and masks out asked items, or, with
+    ``config.info_index``, looks the item up in a :class:`ThetaGridIndex`.
+    With ``config.skill_targets`` each pick is first restricted to the skill
+    furthest below its target share, and only that skill's rows are scored.
+    An attached :class:`OpeningTree` serves the first items without either.
     """
 
-    def __init__(self, bank: ItemBank, config: CATConfig):
+    def __init__(self, bank: ItemBank, config: CATConfig, opening: Optional[OpeningTree] = None):
+        if config.estimator not in {"mle", "eap", "map"}:
+            raise ValueError(f"Unsupported estimator '{config.estimator}'")
         self.bank = bank
         self.cfg = config
+        self.opening = opening
+        self.nodes = config.prior_mean + config.prior_sd * np.linspace(-4, 4, config.quadrature_points)
+        self.log_prior = -0.5 * ((self.nodes - config.prior_mean) / config.prior_sd) ** 2
+        self.index = (
+            ThetaGridIndex(bank, step=config.grid_step, interpolate=config.grid_interpolate)
+            if config.info_index
+            else None
+        )
+        total = sum((config.skill_targets or {}).values())
+        self.skill_targets = {
+            skill: share / total for skill, share in (config.skill_targets or {}).items() if share > 0
+        }
 
     # Fisher information for 2PL
     @staticmethod
@@ -115,13 +387,68 @@ class CATEngine:
         q = 1 - p
         return (item.a ** 2) * p * q
 
+    def bank_information(self, theta: float) -> np.ndarray:
+        """Fisher information of every bank row at *theta*."""
+        a = self.bank.a
+        p = 1.0 / (1.0 + np.exp(-np.clip(a * (theta - self.bank.b), -500, 500)))
+        return a * a * p * (1 - p)
+
+    def asked_mask(self, state: CATState) -> np.ndarray:
+        """Return the session's asked mask, creating or growing it to the bank size."""
+        mask = state.asked_mask
+        if mask is None or len(mask) < len(self.bank):
+            grown = np.zeros(len(self.bank), dtype=bool)
+            if mask is not None:
+                grown[:len(mask)] = mask
+            else:
+                grown[[self.bank.row_of[iid] for iid in state.asked]] = True
+            state.asked_mask = mask = grown
+        return mask
+
+    def balanced_skill(self, state: CATState) -> Optional[Tuple[int, int]]:
+        """Return ``(skill code, asked in skill)`` for the skill furthest below
+        its target share that still has unasked items, or ``None``."""
+        counts: Dict[int, int] = {}
+        for iid in state.asked:
+            code = int(self.bank.skill_codes[self.bank.row_of[iid]])
+            counts[code] = counts.get(code, 0) + 1
+        n = max(1, len(state.asked))
+        best, best_gap = None, -math.inf
+        for skill, share in self.skill_targets.items():
+            code = self.bank.skill_vocab.get(skill)
+            if code is None or counts.get(code, 0) >= len(self.bank._skill_rows.get(code, ())):
+                continue
+            gap = share - counts.get(code, 0) / n
+            if gap > best_gap or (gap == best_gap and code < best):
+                best, best_gap = code, gap
+        return (best, counts.get(best, 0)) if best is not None else None
+
+    def in_opening(self, state: CATState) -> bool:
+        return self.opening is not None and 0 <= state.opening_node < len(self.opening)
+
     def select_next(self, state: CATState) -> Optional[Item]:
-        candidates = [it for it in self.bank.all() if it.id not in state.asked]
-        if not candidates:
+        if self.in_opening(state):
+            return self.bank.items[self.opening.items[state.opening_node]]
+        mask = self.asked_mask(state)
+        balanced = self.balanced_skill(state) if self.skill_targets else None
+        if balanced is not None:
+            code, n_asked = balanced
+            if self.index is not None:
+                row = self.index.select(state.theta, mask, n_asked, skill=code)
+            else:
+                rows = np.array(self.bank._skill_rows[code])
+                a, b = self.bank.a[rows], self.bank.b[rows]
+                p = 1.0 / (1.0 + np.exp(-np.clip(a * (state.theta - b), -500, 500)))
+                row = int(rows[np.argmax(np.where(mask[rows], -np.inf, a * a * p * (1 - p)))])
+            return self.bank.item_at(row)
+        if self.index is not None:
+            row = self.index.select(state.theta, mask, len(state.asked))
+            return self.bank.item_at(row) if row is not None else None
+        if mask.all():
             return None
         # choose the item with max information at current theta
-        best = max(candidates, key=lambda it: self.information(it, state.theta))
-        return best
+        info = np.where(mask, -np.inf, self.bank_information(state.theta))
+        return self.bank.item_at(int(np.argmax(info)))
 
     def update_theta(self, state: CATState, max_iter: int = 25) -> Tuple[float, float]:
         theta = state.theta
@@ -145,19 +472,466 @@ class CATEngine:
         se = math.sqrt(1.0 / max(EPS, -L2)) if L2 < -EPS else float("inf")
         return theta, se
 
+    def update_posterior(self, state: CATState, item: Item, u: int) -> Tuple[float, float]:
+        """Fold one response into the quadrature posterior in O(nodes); return (theta, se).
+
+        Unlike the MLE, the estimate and its SE are finite from the first
+        response, including all-correct and all-wrong patterns.
+        """
+        if state.log_posterior is None:
+            state.log_posterior = self.log_prior.copy()
+        p = 1.0 / (1.0 + np.exp(-item.a * (self.nodes - item.b)))
+        state.log_posterior += np.log(np.clip(p if u else 1 - p, EPS, 1.0))
+        return self.posterior_estimate(state.log_posterior)
+
+    def posterior_estimate(self, log_posterior: np.ndarray) -> Tuple[float, float]:
+        w = np.exp(log_posterior - log_posterior.max())
+        w /= w.sum()
+        mean = float(w @ self.nodes)
+        sd = math.sqrt(float(w @ (self.nodes - mean) ** 2))
+        if self.cfg.estimator == "eap":
+            return mean, sd
+        # MAP: refine the best node with a parabola through its neighbours
+        g = int(np.argmax(log_posterior))
+        if 0 < g < len(self.nodes) - 1:
+            left, mid, right = log_posterior[g - 1:g + 2]
+            curvature = left - 2 * mid + right
+            if curvature < -EPS:
+                h = self.nodes[1] - self.nodes[0]
+                theta = self.nodes[g] + 0.5 * h * (left - right) / curvature
+                return float(theta), math.sqrt(-h * h / curvature)
+        return float(self.nodes[g]), sd
+
+    def replay_posterior(self, state: CATState) -> Tuple[float, float]:
+        """Rebuild the quadrature posterior from all recorded responses."""
+        state.log_posterior = self.log_prior.copy()
+        for iid, u in state.responses.items():
+            it = self.bank.items[iid]
+            p = 1.0 / (1.0 + np.exp(-it.a * (self.nodes - it.b)))
+            state.log_posterior += np.log(np.clip(p if u else 1 - p, EPS, 1.0))
+        return self.posterior_estimate(state.log_posterior)
+
+    def estimate(self, state: CATState, item: Item, u: int) -> Tuple[float, float]:
+        """Update the ability estimate after *item* was answered with *u*."""
+        if self.in_opening(state):
+            node = state.opening_node
+            on_path = self.opening.items[node] == item.id
+            state.opening_node = self.opening.children[node][int(u)] if on_path else -1
+            if on_path and state.opening_node >= 0:
+                return self.opening.theta[node][int(u)], self.opening.se[node][int(u)]
+            if self.cfg.estimator != "mle":
+                # leaving the tree: the posterior was never accumulated along it
+                return self.replay_posterior(state)
+        if self.cfg.estimator == "mle":
+            return self.update_theta(state)
+        return self.update_posterior(state, item, u)
+
+    # Step-wise session API: start_session() -> next_item(state) -> submit(state, u)
+    # Between calls the state can be stored with CATState.to_dict and resumed
+    # by any engine over the same bank.
+
+    def start_session(self) -> CATState:
+        return CATState(theta=self.cfg.start_theta, opening_node=0 if self.opening is not None else -1)
+
+    def finished(self, state: CATState) -> bool:
+        return len(state.asked) >= self.cfg.max_items or state.se <= self.cfg.se_stop
+
+    def next_item(self, state: CATState) -> Optional[Item]:
+        """Return the item to ask next, or ``None`` once the test is over.
+
+        The item stays pending until :meth:`submit`, so repeated calls (e.g. a
+        retried request) return the same item.
+        """
+        if state.pending is not None:
+            return self.bank.items[state.pending]
+        if self.finished(state):
+            return None
+        item = self.select_next(state)
+        state.pending = item.id if item else None
+        return item
+
+    def submit(self, state: CATState, u: int) -> Tuple[float, float]:
+        """Record the response to the pending item and update theta/SE."""
+        if state.pending is None:
+            raise ValueError("No pending item; call next_item() first")
+        item = self.bank.items[state.pending]
+        if self.cfg.estimator != "mle" and state.log_posterior is None and state.asked and not self.in_opening(state):
+            self.replay_posterior(state)  # resumed from to_dict(), which drops the posterior
+        state.pending = None
+        state.record(item, int(u), self.bank.row_of[item.id])
+        state.theta, state.se = self.estimate(state, item, int(u))
+        return state.theta, state.se
+
     def run(self, oracle: Callable[[Item], int]) -> CATState:
-        state = CATState(theta=self.cfg.start_theta)
-        while len(state.asked) < self.cfg.max_items and state.se > self.cfg.se_stop:
-            item = self.select_next(state)
+        state = self.start_session()
+        while True:
+            item = self.next_item(state)
             if not item:
                 break
-            u = oracle(item)  # simulate or collect user response (1/0)
-            state.asked.append(item.id)
-            state.responses[item.id] = u
-            state.theta, state.se = self.update_theta(state)
+            self.submit(state, oracle(item))  # simulate or collect user response (1/0)
         return state
 
 
+def _copy_state(state: CATState) -> CATState:
+    return CATState(
+        asked=list(state.asked),
+        responses=dict(state.responses),
+        theta=state.theta,
+        se=state.se,
+        asked_mask=None if state.asked_mask is None else state.asked_mask.copy(),
+        log_posterior=None if state.log_posterior is None else state.log_posterior.copy(),
+        opening_node=state.opening_node,
+    )
+
+
+class OpeningTree:
+    """Precomputed first ``depth`` items of every CAT session.
+
+    Every session starts from the same state, so the opening items and the
+    estimates after each response pattern are fixed for a given bank and
+    :class:`CATConfig`.  Node ``n`` holds the item to ask and, per response
+    ``u``, the resulting theta/SE and the child node (-1 where the tree ends
+    or the test stops).  Attached to a :class:`CATEngine`, the opening is
+    served by list lookups.
+
+    The tree records a fingerprint of the bank parameters and config it was
+    built from; :meth:`load` refuses a tree built for anything else.
+    """
+
+    def __init__(self, depth: int, fingerprint: str):
+        self.depth = depth
+        self.fingerprint = fingerprint
+        self.items: List[str] = []
+        self.theta: List[List[float]] = []
+        self.se: List[List[float]] = []
+        self.children: List[List[int]] = []
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @staticmethod
+    def bank_fingerprint(bank: ItemBank, config: CATConfig) -> str:
+        digest = hashlib.sha1()
+        digest.update("\n".join(bank.ids).encode("utf-8"))
+        digest.update(np.ascontiguousarray(bank.a).tobytes())
+        digest.update(np.ascontiguousarray(bank.b).tobytes())
+        digest.update(np.ascontiguousarray(bank.skill_codes).tobytes())
+        digest.update(json.dumps(asdict(config), sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, bank: ItemBank, config: CATConfig, depth: int = 4) -> "OpeningTree":
+        """Expand every response pattern of the first *depth* items (2**depth - 1 nodes)."""
+        engine = CATEngine(bank, config)
+        tree = cls(depth, cls.bank_fingerprint(bank, config))
+        limit = min(depth, config.max_items)
+
+        def expand(state: CATState) -> int:
+            if len(state.asked) >= limit or state.se <= config.se_stop:
+                return -1
+            item = engine.select_next(state)
+            if item is None:
+                return -1
+            node = len(tree.items)
+            tree.items.append(item.id)
+            tree.theta.append([0.0, 0.0])
+            tree.se.append([0.0, 0.0])
+            tree.children.append([-1, -1])
+            for u in (0, 1):
+                child = _copy_state(state)
+                child.record(item, u, bank.row_of[item.id])
+                child.theta, child.se = engine.estimate(child, item, u)
+                tree.theta[node][u], tree.se[node][u] = child.theta, child.se
+                tree.children[node][u] = expand(child)
+            return node
+
+        expand(CATState(theta=config.start_theta))
+        return tree
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({
+                "depth": self.depth,
+                "fingerprint": self.fingerprint,
+                "items": self.items,
+                "theta": self.theta,
+                "se": self.se,
+                "children": self.children,
+            }, handle)
+
+    @classmethod
+    def load(cls, path: str, bank: ItemBank, config: CATConfig) -> "OpeningTree":
+        """Load a tree written by :meth:`save`; it must match *bank* and *config*."""
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        if data["fingerprint"] != cls.bank_fingerprint(bank, config):
+            raise ValueError(f"Opening tree {path} was built for a different item bank or CAT config")
+        tree = cls(data["depth"], data["fingerprint"])
+        tree.items, tree.theta, tree.se, tree.children = data["items"], data["theta"], data["se"], data["children"]
+        return tree
+
+    @classmethod
+    def load_or_build(cls, path: str, bank: ItemBank, config: CATConfig, depth: int = 4) -> "OpeningTree":
+        """Load the tree at *path*, rebuilding and saving it if missing or stale."""
+        try:
+            tree = cls.load(path, bank, config)
+            if tree.depth == depth:
+                return tree
+        except (FileNotFoundError, ValueError):
+            pass
+        tree = cls.build(bank, config, depth)
+        tree.save(path)
+        return tree
+
+
+@dataclass
+class SimulationReport:
+    """Per-examinee outcome of a simulated CAT cohort."""
+    true_theta: np.ndarray
+    theta: np.ndarray
+    se: np.ndarray
+    test_length: np.ndarray
+
+    @property
+    def bias(self) -> float:
+        return float(np.mean(self.theta - self.true_theta))
+
+    @property
+    def rmse(self) -> float:
+        return float(np.sqrt(np.mean((self.theta - self.true_theta) ** 2)))
+
+    def summary(self) -> Dict[str, float]:
+        q = np.percentile(self.test_length, [10, 50, 90])
+        return {
+            "examinees": int(len(self.theta)),
+            "mean_length": float(self.test_length.mean()),
+            "length_p10": float(q[0]),
+            "length_p50": float(q[1]),
+            "length_p90": float(q[2]),
+            "bias": self.bias,
+            "rmse": self.rmse,
+            "mean_se": float(np.mean(self.se[np.isfinite(self.se)])) if np.isfinite(self.se).any() else float("inf"),
+        }
+
+    def by_theta(self, bins: Optional[List[float]] = None) -> pd.DataFrame:
+        """Test length, bias and RMSE conditional on the true ability."""
+        bins = bins or [-np.inf, -2, -1, 0, 1, 2, np.inf]
+        frame = pd.DataFrame({
+            "bin": pd.cut(self.true_theta, bins),
+            "error": self.theta - self.true_theta,
+            "length": self.test_length,
+        })
+        grouped = frame.groupby("bin", observed=True)
+        return pd.DataFrame({
+            "examinees": grouped.size(),
+            "mean_length": grouped["length"].mean(),
+            "bias": grouped["error"].mean(),
+            "rmse": grouped["error"].apply(lambda e: float(np.sqrt(np.mean(e ** 2)))),
+        })
+
+
+class CATSimulator:
+    """Advance a cohort of simulated examinees through the CAT in lockstep.
+
+    Mirrors :class:`CATEngine` (selection, estimator and stopping rule from the
+    same :class:`CATConfig`) with every step vectorized over learners.
+    Selection walks the :class:`ThetaGridIndex` lists in a batch (nearest grid
+    point; ``grid_interpolate`` is not applied); one is built even without
+    ``info_index`` unless *exact* is set, in which case each step is an argmax
+    over a learners x items information matrix.  Learners are processed in
+    chunks of *batch_size*; the grid walk only keeps each learner's asked rows,
+    while the exact path's learners x items arrays are capped at about
+    :attr:`CHUNK_CELLS` entries per chunk by default, whatever the bank size.
+    All randomness comes from one ``numpy.random.Generator``.
+
+    With ``estimator="mle"`` learners who answer everything right (or wrong)
+    have no finite estimate, so the report's bias and RMSE are dominated by a
+    few runaway thetas; the quadrature estimators stay within the prior's
+    nodes.  Without a *config* the simulator uses ``CATConfig(estimator="eap")``;
+    pass ``estimator="eap"`` (or ``"map"``) explicitly in a custom config.
+    """
+
+    CHUNK_CELLS = 1 << 22  # learners x items per chunk: 32 MB as float64
+
+    def __init__(
+        self,
+        bank: ItemBank,
+        config: Optional[CATConfig] = None,
+        *,
+        batch_size: Optional[int] = None,
+        exact: bool = False,
+    ):
+        config = config or CATConfig(estimator="eap")
+        self.engine = CATEngine(bank, config)
+        self.bank = bank
+        self.cfg = config
+        self.index = self.engine.index
+        if self.index is None and not exact:
+            self.index = ThetaGridIndex(bank, step=config.grid_step)
+        if batch_size is None:
+            batch_size = 8192 if self.index is not None else max(1, self.CHUNK_CELLS // max(1, len(bank)))
+        self.batch_size = batch_size
+
+    def run(
+        self,
+        true_theta: Union[int, np.ndarray],
+        *,
+        seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None,
+    ) -> SimulationReport:
+        """Simulate *true_theta* examinees (or that many drawn from the prior)."""
+        rng = rng or np.random.default_rng(seed)
+        if np.isscalar(true_theta):
+            true_theta = rng.normal(self.cfg.prior_mean, self.cfg.prior_sd, int(true_theta))
+        true_theta = np.asarray(true_theta, dtype=np.float64)
+        theta = np.empty_like(true_theta)
+        se = np.empty_like(true_theta)
+        length = np.empty(len(true_theta), dtype=np.int32)
+        for start in range(0, len(true_theta), self.batch_size):
+            chunk = slice(start, start + self.batch_size)
+            theta[chunk], se[chunk], length[chunk] = self._run_batch(true_theta[chunk], rng)
+        return SimulationReport(true_theta=true_theta, theta=theta, se=se, test_length=length)
+
+    def _run_batch(
+        self,
+        true_theta: np.ndarray,
+        rng: np.random.Generator,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        n, cfg, engine = len(true_theta), self.cfg, self.engine
+        a_bank, b_bank = self.bank.a, self.bank.b
+        steps = min(cfg.max_items, len(self.bank))
+        theta = np.full(n, cfg.start_theta)
+        se = np.full(n, np.inf)
+        length = np.zeros(n, dtype=np.int32)
+        asked = np.zeros((n, len(self.bank)), dtype=bool) if self.index is None else None
+        history_rows = np.full((n, steps), -1, dtype=np.int64)
+        history_a = np.zeros((n, steps))
+        history_b = np.zeros((n, steps))
+        history_u = np.zeros((n, steps))
+        log_posterior = np.tile(engine.log_prior, (n, 1)) if cfg.estimator != "mle" else None
+        skill_counts = np.zeros((n, len(self.bank.skill_vocab)), dtype=np.int32) if engine.skill_targets else None
+        active = np.arange(n)
+        for k in range(steps):
+            active = active[se[active] > cfg.se_stop]
+            if not len(active):
+                break
+            counts = skill_counts[active] if skill_counts is not None else None
+            seen = asked[active] if asked is not None else history_rows[active, :k]
+            rows = self._select(theta[active], seen, k, counts)
+            if asked is not None:
+                asked[active, rows] = True
+            history_rows[active, k] = rows
+            if skill_counts is not None:
+                skill_counts[active, self.bank.skill_codes[rows]] += 1
+            a, b = a_bank[rows], b_bank[rows]
+            u = rng.random(len(active)) < 1.0 / (1.0 + np.exp(-a * (true_theta[active] - b)))
+            history_a[active, k], history_b[active, k], history_u[active, k] = a, b, u
+            length[active] = k + 1
+            if log_posterior is None:
+                theta[active], se[active] = self._mle(
+                    theta[active], history_a[active, :k + 1], history_b[active, :k + 1], history_u[active, :k + 1]
+                )
+            else:
+                p = 1.0 / (1.0 + np.exp(-a[:, None] * (engine.nodes - b[:, None])))
+                log_posterior[active] += np.log(np.clip(np.where(u[:, None], p, 1 - p), EPS, 1.0))
+                theta[active], se[active] = self._posterior(log_posterior[active])
+        return theta, se, length
+
+    def _balanced_skills(self, counts: np.ndarray, k: int) -> np.ndarray:
+        """Vectorized :meth:`CATEngine.balanced_skill`; -1 where no skill qualifies."""
+        vocab = self.bank.skill_vocab
+        target = np.full(counts.shape[1], -np.inf)
+        for skill, share in self.engine.skill_targets.items():
+            if skill in vocab:
+                target[vocab[skill]] = share
+        sizes = np.array([len(self.bank._skill_rows.get(code, ())) for code in range(counts.shape[1])])
+        gap = np.where(counts < sizes, target - counts / max(1, k), -np.inf)
+        best = np.argmax(gap, axis=1)
+        return np.where(np.isfinite(gap[np.arange(len(gap)), best]), best, -1)
+
+    def _select(
+        self,
+        theta: np.ndarray,
+        asked: np.ndarray,
+        k: int,
+        skill_counts: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Pick one row per learner.  *asked* is a learners x items mask on
+        the exact path and the learners' asked rows so far on the grid walk."""
+        index = self.index
+        skills = self._balanced_skills(skill_counts, k) if skill_counts is not None else None
+        if index is None:
+            a, b = self.bank.a, self.bank.b
+            p = 1.0 / (1.0 + np.exp(-np.clip(a * (theta[:, None] - b), -500, 500)))
+            blocked = asked
+            if skills is not None:
+                blocked = asked | ((skills[:, None] >= 0) & (self.bank.skill_codes != skills[:, None]))
+            info = np.where(blocked, -np.inf, a * a * p * (1 - p))
+            return np.argmax(info, axis=1)
+        index.refresh()
+        g = np.clip(np.rint((theta - index.grid[0]) / index.step), 0, len(index.grid) - 1).astype(int)
+        if skills is None:
+            skills = np.full(len(theta), -1)
+        rows = np.empty(len(theta), dtype=np.int64)
+        for code in np.unique(skills):
+            group = np.flatnonzero(skills == code)
+            if code < 0:
+                order, depth = index._order, k + 1  # every learner has asked exactly k items
+            else:
+                order, depth = index.skill_order(int(code)), int(skill_counts[group, code].max()) + 1
+            head = order[g[group], :depth]
+            free = ~(head[:, :, None] == asked[group][:, None, :]).any(axis=2)
+            rows[group] = head[np.arange(len(group)), np.argmax(free, axis=1)]
+        return rows
+
+    @staticmethod
+    def _mle(
+        theta: np.ndarray,
+        a: np.ndarray,
+        b: np.ndarray,
+        u: np.ndarray,
+        max_iter: int = 25,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized version of :meth:`CATEngine.update_theta`."""
+        theta = theta.copy()
+        L2 = np.zeros(len(theta))
+        running = np.ones(len(theta), dtype=bool)
+        for _ in range(max_iter):
+            p = 1.0 / (1.0 + np.exp(-np.clip(a * (theta[:, None] - b), -500, 500)))
+            L1_now = (a * (u - p)).sum(axis=1)
+            L2_now = -(a * a * p * (1 - p)).sum(axis=1)
+            L2 = np.where(running, L2_now, L2)
+            running &= np.abs(L2_now) >= EPS
+            step = np.where(running, L1_now / np.where(running, L2_now, 1.0), 0.0)
+            theta -= step
+            running &= np.abs(step) >= 1e-3
+            if not running.any():
+                break
+        safe = np.where(L2 < -EPS, -L2, 1.0)
+        se = np.where(L2 < -EPS, np.sqrt(1.0 / np.maximum(EPS, safe)), np.inf)
+        return theta, se
+
+    def _posterior(self, log_posterior: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        nodes = self.engine.nodes
+        w = np.exp(log_posterior - log_posterior.max(axis=1, keepdims=True))
+        w /= w.sum(axis=1, keepdims=True)
+        mean = w @ nodes
+        sd = np.sqrt(np.einsum("nq,nq->n", w, (nodes - mean[:, None]) ** 2))
+        if self.cfg.estimator == "eap":
+            return mean, sd
+        best = np.argmax(log_posterior, axis=1)
+        g = np.clip(best, 1, len(nodes) - 2)
+        rows = np.arange(len(g))
+        left, mid, right = log_posterior[rows, g - 1], log_posterior[rows, g], log_posterior[rows, g + 1]
+        curvature = left - 2 * mid + right
+        h = nodes[1] - nodes[0]
+        peaked = (best == g) & (curvature < -EPS)
+        safe = np.where(peaked, curvature, -1.0)
+        theta = np.where(peaked, nodes[g] + 0.5 * h * (left - right) / safe, nodes[best])
+        se = np.where(peaked, np.sqrt(-h * h / safe), sd)
+        return theta, se
+
+
 # ----------------------------
 # Knowledge Tracing (BKT per skill)
 # ----------------------------
@@ -176,31 +950,154 @@ class BKTState:
 
 
 class KnowledgeTracer:
-    """Classic BKT with per-skill priors. Update after each item response."""
+    """Classic BKT with per-skill priors. Update after each item response.
 
-    def __init__(self, skills: List[str], params: Optional[BKTParams] = None):
+    ``params`` is one :class:`BKTParams` for every skill, or a dict of
+    per-skill params (e.g. ``fit_bkt(...).params``); skills missing from the
+    dict use the defaults.
+    """
+
+    def __init__(self, skills: List[str], params: Optional[Union[BKTParams, Dict[str, BKTParams]]] = None):
         self.skills = skills
-        self.p = params or BKTParams()
-        self.state = BKTState({s: self.p.p_init for s in skills})
+        if isinstance(params, dict):
+            self.p = BKTParams()
+            self.skill_params = dict(params)
+        else:
+            self.p = params or BKTParams()
+            self.skill_params = {}
+        self.state = BKTState({s: self.params_for(s).p_init for s in skills})
+
+    def params_for(self, skill: str) -> BKTParams:
+        return self.skill_params.get(skill, self.p)
 
     def update(self, skill: str, correct: int):
         p_k = self.state.mastery[skill]
+        p = self.params_for(skill)
         # Bayes update
         if correct:
-            num = p_k * (1 - self.p.p_slip)
-            den = num + (1 - p_k) * self.p.p_guess
+            num = p_k * (1 - p.p_slip)
+            den = num + (1 - p_k) * p.p_guess
         else:
-            num = p_k * self.p.p_slip
-            den = num + (1 - p_k) * (1 - self.p.p_guess)
+            num = p_k * p.p_slip
+            den = num + (1 - p_k) * (1 - p.p_guess)
         p_k_given = num / max(EPS, den)
         # learning transition
-        p_next = p_k_given + (1 - p_k_given) * self.p.p_transit
+        p_next = p_k_given + (1 - p_k_given) * p.p_transit
         self.state.mastery[skill] = p_next
 
     def mastery_snapshot(self) -> Dict[str, float]:
         return dict(self.state.mastery)
 
 
+class BatchKnowledgeTracer:
+    """BKT for many learners at once: mastery is a learners x skills array.
+
+    :meth:`apply` takes a batch of ``(learner, skill, correct)`` events in
+    chronological order and applies the same Bayes and learning-transition
+    update as :class:`KnowledgeTracer` to all of them with array operations.
+    Skills are traced independently, so only events on the same (learner,
+    skill) pair have to stay ordered: each event gets its rank among the
+    earlier events of its pair, and the batch is applied in waves of equal
+    rank, each of which touches every pair at most once.
+    """
+
+    def __init__(
+        self,
+        skills: List[str],
+        params: Optional[Union[BKTParams, Dict[str, BKTParams]]] = None,
+        capacity: int = 1024,
+    ):
+        self.skills = list(skills)
+        self.skill_of = {s: k for k, s in enumerate(self.skills)}
+        # same params convention as KnowledgeTracer, stored as per-skill columns
+        defaults = KnowledgeTracer(self.skills, params)
+        per_skill = [defaults.params_for(s) for s in self.skills]
+        self.p_init = np.array([p.p_init for p in per_skill], dtype=np.float64)
+        self.p_transit = np.array([p.p_transit for p in per_skill], dtype=np.float64)
+        self.p_slip = np.array([p.p_slip for p in per_skill], dtype=np.float64)
+        self.p_guess = np.array([p.p_guess for p in per_skill], dtype=np.float64)
+        self.learner_ids: List[str] = []
+        self.learner_of: Dict[str, int] = {}
+        self._mastery = np.tile(self.p_init, (capacity, 1))
+
+    def __len__(self) -> int:
+        return len(self.learner_ids)
+
+    @property
+    def mastery(self) -> np.ndarray:
+        return self._mastery[:len(self.learner_ids)]
+
+    def learner_codes(self, learner_ids: Sequence) -> np.ndarray:
+        """Map learner ids to rows, adding unseen learners at ``p_init``."""
+        local, uniques = pd.factorize(pd.Series(learner_ids))
+        rows = np.empty(len(uniques), dtype=np.int64)
+        for k, key in enumerate(uniques):
+            code = self.learner_of.get(key)
+            if code is None:
+                code = self.learner_of[key] = len(self.learner_ids)
+                self.learner_ids.append(key)
+            rows[k] = code
+        if len(self.learner_ids) > len(self._mastery):
+            grown = np.tile(self.p_init, (max(len(self.learner_ids), 2 * len(self._mastery)), 1))
+            grown[:len(self._mastery)] = self._mastery
+            self._mastery = grown
+        return rows[local]
+
+    def apply(self, learner_ids: Sequence, skills: Sequence[str], correct: Sequence[int]):
+        """Apply a chronologically ordered batch of responses."""
+        local, uniques = pd.factorize(pd.Series(skills))
+        self.apply_codes(
+            self.learner_codes(learner_ids),
+            np.array([self.skill_of[s] for s in uniques], dtype=np.int64)[local],
+            correct,
+        )
+
+    def apply_codes(self, learners: np.ndarray, skills: np.ndarray, correct: Sequence[int]):
+        """:meth:`apply` for learner rows and skill indexes that are already encoded."""
+        learners = np.asarray(learners, dtype=np.int64)
+        skills = np.asarray(skills, dtype=np.int64)
+        correct = np.asarray(correct).astype(bool)
+        if not len(learners):
+            return
+        # rank of each event among the earlier events of its (learner, skill) pair
+        n = len(learners)
+        pair = learners * len(self.skills) + skills
+        # sorting pair * n + position is a stable sort by pair, but unique keys
+        # let numpy use its fast unstable sort
+        keys = np.sort(pair * n + np.arange(n))
+        by_pair, sorted_pair = keys % n, keys // n
+        starts = np.flatnonzero(np.r_[True, sorted_pair[1:] != sorted_pair[:-1]])
+        sizes = np.diff(np.r_[starts, n])
+        rank = np.empty(n, dtype=np.int64)
+        rank[by_pair] = np.arange(n) - np.repeat(starts, sizes)
+        # waves of equal rank, chronological within each pair (radix sort on small ranks)
+        by_wave = np.argsort(rank.astype(np.int16) if sizes.max() <= 1 << 15 else rank, kind="stable")
+        bounds = np.r_[0, np.cumsum(np.bincount(rank))]
+        mastery = self._mastery.reshape(-1)  # flat view: pair code is the offset
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            wave = by_wave[lo:hi]
+            cell, s, u = pair[wave], skills[wave], correct[wave]
+            p_k = mastery[cell]
+            slip, guess = self.p_slip[s], self.p_guess[s]
+            # Bayes update
+            num = np.where(u, p_k * (1 - slip), p_k * slip)
+            den = num + np.where(u, (1 - p_k) * guess, (1 - p_k) * (1 - guess))
+            p_k_given = num / np.maximum(EPS, den)
+            # learning transition
+            mastery[cell] = p_k_given + (1 - p_k_given) * self.p_transit[s]
+
+    def replay(self, events: pd.DataFrame, chunk_size: int = 1_000_000):
+        """Apply an event log with ``learner``, ``skill`` and ``correct`` columns, in row order."""
+        for start in range(0, len(events), chunk_size):
+            chunk = events.iloc[start:start + chunk_size]
+            self.apply(chunk["learner"], chunk["skill"], chunk["correct"].to_numpy())
+
+    def mastery_snapshot(self, learner_id: str) -> Dict[str, float]:
+        row = self.learner_of.get(learner_id)
+        values = self.mastery[row] if row is not None else self.p_init
+        return {s: float(v) for s, v in zip(self.skills, values)}
+
+
 # ----------------------------
 # LLM-powered analysis (interface + fallback rubric)
 # ----------------------------
@@ -299,13 +1196,15 @@ class DKEPipeline:
         bank: ItemBank,
         cat_cfg: CATConfig,
         skills: List[str],
-        bkt_params: Optional[BKTParams] = None,
+        bkt_params: Optional[Union[BKTParams, Dict[str, BKTParams]]] = None,
         rubric: Optional[Rubric] = None,
         model_fn: Optional[Callable[[str], Dict[str, float]]] = None,
     ):
         self.bank = bank
         self.cat = CATEngine(bank, cat_cfg)
-        self.kt = KnowledgeTracer(skills, bkt_params)
+        self.skills = skills
+        self.bkt_params = bkt_params
+        self.kt = KnowledgeTracer(skills, bkt_params)  # priors only; evaluate() traces on a fresh copy
         self.grader = LLMGrader(model_fn=model_fn)
         # sensible default rubric
         self.rubric = rubric or Rubric(
@@ -334,12 +1233,30 @@ class DKEPipeline:
     ) -> DKEResult:
         # 1) CAT loop
         cat_state = self.cat.run(oracle)
+        return self.evaluate(
+            cat_state, response_free_text, reference_text, self_assess, concept_edges, required_edges
+        )
 
+    def evaluate(
+        self,
+        cat_state: CATState,
+        response_free_text: str,
+        reference_text: str,
+        self_assess: SelfAssessment,
+        concept_edges: List[Tuple[str, str]],
+        required_edges: List[Tuple[str, str]],
+    ) -> DKEResult:
+        """Score a finished CAT session (from :meth:`run` or the step API).
+
+        Mastery is traced from the BKT priors on a tracer of its own, so
+        sessions evaluated by the same pipeline do not see each other's answers.
+        """
         # 2) Update BKT as we go (replay responses)
+        kt = KnowledgeTracer(self.skills, self.bkt_params)
         for iid, u in cat_state.responses.items():
-            self.kt.update(self.bank.items[iid].skill, u)
+            kt.update(self.bank.items[iid].skill, u)
 
-        mastery = self.kt.mastery_snapshot()
+        mastery = kt.mastery_snapshot()
 
         # 3) LLM (or fallback) grading on free-text response
         llm_overall, llm_scores = self.grader.grade(response_free_text, self.rubric, reference_text)
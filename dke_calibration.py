@@ -0,0 +1,500 @@
+"""
+DKE Calibration
+===============
+
+Fits model parameters for :mod:`dke` from logged learner responses.
+
+  • 2PL item calibration by marginal maximum likelihood (Bock-Aitkin EM)
+    over a fixed quadrature of the ability distribution
+  • Per-skill BKT parameters by EM (Baum-Welch) over response sequences
+
+Responses are kept in long format (one row per response: learner code, item
+code, correct flag; 9 bytes each), so a million responses over ten thousand
+items fits in a few tens of megabytes.  Every EM pass is a handful of
+``np.bincount`` reductions over those columns, one per quadrature node; no
+learners x items matrix is ever materialized.
+
+Usage:
+------
+from dke_calibration import ResponseLog, calibrate_2pl
+
+log = ResponseLog.from_stream(rows)          # (learner_id, item_id, correct)
+result = calibrate_2pl(log)
+bank = result.to_item_bank(existing_bank)    # or skills={item_id: skill}
+
+fit = fit_bkt(events, processes=4)           # learner, skill, correct columns
+tracer = KnowledgeTracer(skills, fit.params)
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from dke import EPS, BKTParams, Item, ItemBank
+
+
+# ----------------------------
+# Response storage
+# ----------------------------
+
+class ResponseLog:
+    """Growable long-format store of (learner, item, correct) responses.
+
+    Learner and item ids are mapped to dense integer codes on arrival;
+    ``learners``, ``items`` and ``correct`` are row-aligned NumPy views.
+    """
+
+    def __init__(self, capacity: int = 1 << 16):
+        self.learner_ids: List[str] = []
+        self.item_ids: List[str] = []
+        self.learner_of: Dict[str, int] = {}
+        self.item_of: Dict[str, int] = {}
+        self._learners = np.zeros(capacity, dtype=np.int32)
+        self._items = np.zeros(capacity, dtype=np.int32)
+        self._correct = np.zeros(capacity, dtype=np.int8)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def learners(self) -> np.ndarray:
+        return self._learners[:self._size]
+
+    @property
+    def items(self) -> np.ndarray:
+        return self._items[:self._size]
+
+    @property
+    def correct(self) -> np.ndarray:
+        return self._correct[:self._size]
+
+    def _codes(self, ids: Sequence, vocab: Dict[str, int], names: List[str]) -> np.ndarray:
+        codes = np.empty(len(ids), dtype=np.int32)
+        for k, key in enumerate(ids):
+            key = str(key)
+            code = vocab.get(key)
+            if code is None:
+                code = vocab[key] = len(names)
+                names.append(key)
+            codes[k] = code
+        return codes
+
+    def add(self, learner_ids: Sequence, item_ids: Sequence, correct: Sequence):
+        """Append one chunk of responses (three equal-length sequences)."""
+        correct = np.asarray(correct, dtype=np.int8)
+        n = len(correct)
+        if len(learner_ids) != n or len(item_ids) != n:
+            raise ValueError("learner_ids, item_ids and correct must have equal length")
+        end = self._size + n
+        if end > len(self._correct):
+            capacity = max(end, 2 * len(self._correct))
+            self._learners = np.resize(self._learners, capacity)
+            self._items = np.resize(self._items, capacity)
+            self._correct = np.resize(self._correct, capacity)
+        self._learners[self._size:end] = self._codes(learner_ids, self.learner_of, self.learner_ids)
+        self._items[self._size:end] = self._codes(item_ids, self.item_of, self.item_ids)
+        self._correct[self._size:end] = correct != 0
+        self._size = end
+
+    @classmethod
+    def from_stream(cls, rows: Iterable[Tuple[str, str, int]], chunk_size: int = 1 << 16) -> "ResponseLog":
+        """Build a log from an iterable of ``(learner_id, item_id, correct)`` rows.
+
+        Rows are consumed in chunks, so generators over files or cursors never
+        need to be held in memory as Python objects.
+        """
+        log = cls()
+        chunk: List[Tuple[str, str, int]] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                log.add(*zip(*chunk))
+                chunk = []
+        if chunk:
+            log.add(*zip(*chunk))
+        return log
+
+    @classmethod
+    def from_matrix(
+        cls,
+        matrix,
+        item_ids: Optional[Sequence[str]] = None,
+        learner_ids: Optional[Sequence[str]] = None,
+    ) -> "ResponseLog":
+        """Build a log from a learners x items response matrix.
+
+        Dense arrays mark unanswered cells with NaN.  Sparse matrices (anything
+        with ``tocoo()``, e.g. ``scipy.sparse``) treat every *stored* entry as
+        an observed response, so incorrect answers must be explicit zeros.
+        """
+        if hasattr(matrix, "tocoo"):
+            coo = matrix.tocoo()
+            rows, cols, values = coo.row, coo.col, coo.data
+        else:
+            matrix = np.asarray(matrix, dtype=np.float64)
+            rows, cols = np.nonzero(~np.isnan(matrix))
+            values = matrix[rows, cols]
+        n_learners, n_items = matrix.shape
+        learner_ids = list(learner_ids) if learner_ids is not None else [str(i) for i in range(n_learners)]
+        item_ids = list(item_ids) if item_ids is not None else [str(j) for j in range(n_items)]
+        log = cls(capacity=max(1, len(values)))
+        # register ids in matrix order so codes equal matrix positions
+        log._codes(learner_ids, log.learner_of, log.learner_ids)
+        log._codes(item_ids, log.item_of, log.item_ids)
+        n = len(values)
+        log._learners[:n] = rows
+        log._items[:n] = cols
+        log._correct[:n] = np.asarray(values) != 0
+        log._size = n
+        return log
+
+
+# ----------------------------
+# 2PL calibration (MML-EM)
+# ----------------------------
+
+@dataclass
+class CalibrationConfig:
+    quadrature_points: int = 41
+    max_iter: int = 200
+    tol: float = 1e-4             # stop when no a/b moves more than this
+    newton_steps: int = 3         # M-step Newton iterations per EM cycle
+    # weak normal priors on slope a and intercept c = -a*b keep items with
+    # few or all-correct/all-wrong responses finite
+    prior_a_mean: float = 1.0
+    prior_a_sd: float = 1.0
+    prior_c_sd: float = 3.0
+    min_a: float = 0.05
+    max_a: float = 5.0
+
+
+@dataclass
+class CalibrationResult:
+    item_ids: List[str]
+    a: np.ndarray
+    b: np.ndarray
+    n_responses: np.ndarray
+    log_likelihood: List[float] = field(default_factory=list)
+    converged: bool = False
+
+    @property
+    def iterations(self) -> int:
+        return len(self.log_likelihood)
+
+    def to_item_bank(
+        self,
+        bank: Optional[ItemBank] = None,
+        skills: Optional[Dict[str, str]] = None,
+        default_skill: str = "general",
+    ) -> ItemBank:
+        """Write the fitted parameters out as an :class:`ItemBank`.
+
+        With *bank*, a new bank is returned holding every item of *bank*, with
+        ``a``/``b`` replaced for the calibrated ones (text, skill and choices
+        are kept).  Calibrated ids that *bank* lacks are created with a skill
+        from *skills* (or *default_skill*) and the id as their text.
+        """
+        skills = skills or {}
+        items = dict(bank.items) if bank is not None else {}
+        for iid, a, b in zip(self.item_ids, self.a, self.b):
+            if iid in items:
+                items[iid] = replace(items[iid], a=float(a), b=float(b))
+            else:
+                items[iid] = Item(iid, skills.get(iid, default_skill), float(a), float(b), iid)
+        return ItemBank(items)
+
+
+def calibrate_2pl(
+    log: ResponseLog,
+    config: Optional[CalibrationConfig] = None,
+    init: Optional[ItemBank] = None,
+) -> CalibrationResult:
+    """Fit 2PL ``a``/``b`` for every item in *log* by MML-EM.
+
+    Abilities are integrated out over a standard-normal quadrature.  The
+    E-step accumulates each learner's log-likelihood at every node, and the
+    expected correct/total counts per item and node, with one ``np.bincount``
+    over the response columns per node.
+    The M-step takes a few vectorized Newton steps on all items at once in
+    slope-intercept form.  *init* warm-starts items already in a bank.
+    """
+    cfg = config or CalibrationConfig()
+    n_learners, n_items = len(log.learner_ids), len(log.item_ids)
+    # sort by learner once so the per-node gathers below walk memory in order
+    order = np.argsort(log.learners, kind="stable")
+    learners = log.learners[order]
+    # a response's likelihood at a node depends only on (item, correct), so
+    # each E-step gathers from an items x 2 table instead of evaluating R logits
+    outcome = 2 * log.items[order].astype(np.int64) + log.correct[order]
+
+    nodes = np.linspace(-4, 4, cfg.quadrature_points)
+    log_prior = -0.5 * nodes ** 2
+    log_prior -= np.log(np.exp(log_prior).sum())
+
+    a = np.full(n_items, cfg.prior_a_mean)
+    c = np.zeros(n_items)
+    if init is not None:
+        for j, iid in enumerate(log.item_ids):
+            item = init.items.get(iid)
+            if item is not None:
+                a[j], c[j] = item.a, -item.a * item.b
+    n_responses = np.bincount(log.items, minlength=n_items)
+
+    history: List[float] = []
+    converged = False
+    log_post = np.empty((len(nodes), n_learners))
+    expected_n = np.empty((n_items, len(nodes)))
+    expected_r = np.empty((n_items, len(nodes)))
+    for _ in range(cfg.max_iter):
+        # E-step: log P(responses | theta = node) per learner, then posterior
+        z = a[:, None] * nodes + c[:, None]
+        table = np.empty((n_items, 2, len(nodes)))
+        table[:, 0] = -np.logaddexp(0.0, z)     # log(1 - P)
+        table[:, 1] = -np.logaddexp(0.0, -z)    # log P
+        table = np.ascontiguousarray(table.transpose(2, 0, 1).reshape(len(nodes), -1))
+        for q in range(len(nodes)):
+            log_post[q] = np.bincount(learners, weights=table[q][outcome], minlength=n_learners)
+        log_post += log_prior[:, None]
+        top = log_post.max(axis=0)
+        post = np.exp(log_post - top)
+        norm = post.sum(axis=0)
+        post /= norm
+        history.append(float((top + np.log(norm)).sum()))
+
+        # expected responses (n) and expected correct responses (r) per item and node
+        for q in range(len(nodes)):
+            counts = np.bincount(outcome, weights=post[q][learners], minlength=2 * n_items).reshape(n_items, 2)
+            expected_r[:, q] = counts[:, 1]
+            expected_n[:, q] = counts[:, 0] + counts[:, 1]
+
+        # M-step: Newton on each item's expected complete-data log-likelihood
+        a_old, b_old = a.copy(), -c / a
+        for _ in range(cfg.newton_steps):
+            p = 1.0 / (1.0 + np.exp(-(a[:, None] * nodes + c[:, None])))
+            resid = expected_r - expected_n * p
+            w = expected_n * p * (1 - p)
+            g_a = resid @ nodes - (a - cfg.prior_a_mean) / cfg.prior_a_sd ** 2
+            g_c = resid.sum(axis=1) - c / cfg.prior_c_sd ** 2
+            h_aa = w @ (nodes * nodes) + 1.0 / cfg.prior_a_sd ** 2
+            h_ac = w @ nodes
+            h_cc = w.sum(axis=1) + 1.0 / cfg.prior_c_sd ** 2
+            det = np.maximum(h_aa * h_cc - h_ac * h_ac, EPS)
+            a = np.clip(a + (h_cc * g_a - h_ac * g_c) / det, cfg.min_a, cfg.max_a)
+            c = c + (h_aa * g_c - h_ac * g_a) / det
+        if max(np.abs(a - a_old).max(initial=0.0), np.abs(-c / a - b_old).max(initial=0.0)) < cfg.tol:
+            converged = True
+            break
+
+    return CalibrationResult(
+        item_ids=list(log.item_ids),
+        a=a,
+        b=-c / a,
+        n_responses=n_responses,
+        log_likelihood=history,
+        converged=converged,
+    )
+
+
+# ----------------------------
+# BKT parameter fitting (EM / Baum-Welch)
+# ----------------------------
+
+@dataclass
+class BKTFitConfig:
+    max_iter: int = 100
+    tol: float = 1e-6           # a skill stops once its log-likelihood per response gains less
+    init: BKTParams = field(default_factory=BKTParams)
+    # upper bounds keep the known/unknown states from swapping meaning
+    max_slip: float = 0.3
+    max_guess: float = 0.3
+    min_prob: float = 1e-4
+
+
+@dataclass
+class BKTFitResult:
+    params: Dict[str, BKTParams]          # per skill, ready for KnowledgeTracer
+    log_likelihood: Dict[str, float]
+    n_responses: Dict[str, int]
+    n_sequences: Dict[str, int]
+    iterations: int = 0
+
+
+def _pack_sequences(learners: np.ndarray, skills: np.ndarray, correct: np.ndarray):
+    """Lay (learner, skill) response sequences out time-major without padding.
+
+    Sequences are sorted by length (longest first), so the sequences still
+    running at step ``t`` are always the first ``k[t]``; step ``t`` occupies
+    cells ``off[t]:off[t] + k[t]`` and its first ``k[t + 1]`` cells continue
+    at step ``t + 1``.  This is a padded sequences x steps array with the
+    padding squeezed out.
+    """
+    n = len(learners)
+    pair = learners * (int(skills.max()) + 1) + skills
+    keys = np.sort(pair * n + np.arange(n))      # stable sort by pair, see BatchKnowledgeTracer
+    by_pair, sorted_pair = keys % n, keys // n
+    starts = np.flatnonzero(np.r_[True, sorted_pair[1:] != sorted_pair[:-1]])
+    lengths = np.diff(np.r_[starts, n])
+    step = np.empty(n, dtype=np.int64)
+    step[by_pair] = np.arange(n) - np.repeat(starts, lengths)
+    seq_of_event = np.empty(n, dtype=np.int64)
+    seq_of_event[by_pair] = np.repeat(np.arange(len(starts)), lengths)
+
+    by_length = np.argsort(-lengths, kind="stable")
+    position = np.empty(len(starts), dtype=np.int64)
+    position[by_length] = np.arange(len(starts))
+    k = len(starts) - np.cumsum(np.bincount(lengths))[:-1]   # k[t]: sequences longer than t
+    off = np.r_[0, np.cumsum(k)]
+    obs = np.zeros(n, dtype=bool)
+    obs[off[step] + position[seq_of_event]] = correct
+    seq_skill = skills[by_pair[starts]][by_length]
+    cell_skill = np.concatenate([seq_skill[:kt] for kt in k])
+    return obs, k, off, seq_skill, cell_skill
+
+
+def _fit_bkt_group(
+    learners: np.ndarray,
+    skills: np.ndarray,
+    correct: np.ndarray,
+    n_skills: int,
+    cfg: BKTFitConfig,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """EM for the skills coded ``0..n_skills-1``; returns (params, log-likelihoods, iterations).
+
+    All skills share one scaled forward-backward sweep: every cell carries
+    its skill's parameters, and the M-step sums per skill with bincount.
+    """
+    obs, k, off, seq_skill, cell_skill = _pack_sequences(learners, skills, correct)
+    n_resp = np.maximum(np.bincount(cell_skill, minlength=n_skills), 1)
+    n_seq = np.maximum(np.bincount(seq_skill, minlength=n_skills), 1)
+    p_init = np.full(n_skills, cfg.init.p_init)
+    p_transit = np.full(n_skills, cfg.init.p_transit)
+    p_slip = np.full(n_skills, cfg.init.p_slip)
+    p_guess = np.full(n_skills, cfg.init.p_guess)
+    lo = cfg.min_prob
+
+    total = len(obs)
+    alpha = np.empty((total, 2))       # P(unknown/known | responses so far), normalized
+    beta = np.ones((total, 2))
+    scale = np.empty(total)
+    learned = np.zeros(total)          # expected unknown -> known transitions after each cell
+    has_next = np.zeros(total, dtype=bool)
+    for t in range(len(k) - 1):
+        has_next[off[t]:off[t] + k[t + 1]] = True
+    previous = np.full(n_skills, -np.inf)
+    active = np.ones(n_skills, dtype=bool)   # skills still improving; converged ones are frozen
+    iterations = 0
+    for iterations in range(1, cfg.max_iter + 1):
+        guess, slip = p_guess[cell_skill], p_slip[cell_skill]
+        emit = np.stack([np.where(obs, guess, 1 - guess), np.where(obs, 1 - slip, slip)], axis=1)
+        transit = p_transit[cell_skill]
+
+        # forward
+        first = slice(0, k[0])
+        prior = np.stack([1 - p_init[seq_skill], p_init[seq_skill]], axis=1)
+        alpha[first] = prior * emit[first]
+        for t in range(len(k)):
+            cur = slice(off[t], off[t] + k[t])
+            if t:
+                prev = alpha[off[t - 1]:off[t - 1] + k[t]]
+                tr = transit[cur]
+                alpha[cur, 0] = prev[:, 0] * (1 - tr) * emit[cur, 0]
+                alpha[cur, 1] = (prev[:, 0] * tr + prev[:, 1]) * emit[cur, 1]
+            scale[cur] = alpha[cur].sum(axis=1)
+            alpha[cur] /= scale[cur, None]
+
+        # backward (the transition into cell t + 1 uses that cell's skill, same as cell t)
+        beta[:] = 1.0
+        learned[:] = 0.0
+        for t in range(len(k) - 2, -1, -1):
+            cur = slice(off[t], off[t] + k[t + 1])
+            nxt = slice(off[t + 1], off[t + 1] + k[t + 1])
+            msg = emit[nxt] * beta[nxt] / scale[nxt, None]
+            tr = transit[nxt]
+            beta[cur, 0] = (1 - tr) * msg[:, 0] + tr * msg[:, 1]
+            beta[cur, 1] = msg[:, 1]
+            learned[cur] = alpha[cur, 0] * tr * msg[:, 1]
+        gamma = alpha * beta
+
+        log_likelihood = np.bincount(cell_skill, weights=np.log(scale), minlength=n_skills)
+        # per-skill stopping keeps each skill's fit independent of how skills are grouped
+        active &= (log_likelihood - previous) / n_resp >= cfg.tol
+        previous = log_likelihood
+        if not active.any():
+            break
+
+        # M-step
+        unknown = np.bincount(cell_skill, weights=gamma[:, 0], minlength=n_skills)
+        known = np.bincount(cell_skill, weights=gamma[:, 1], minlength=n_skills)
+        new_init = np.bincount(seq_skill, weights=gamma[first, 1], minlength=n_skills) / n_seq
+        new_transit = np.bincount(cell_skill, weights=learned, minlength=n_skills) / np.maximum(
+            np.bincount(cell_skill, weights=gamma[:, 0] * has_next, minlength=n_skills), EPS
+        )
+        new_guess = np.bincount(cell_skill, weights=gamma[:, 0] * obs, minlength=n_skills) / np.maximum(unknown, EPS)
+        new_slip = np.bincount(cell_skill, weights=gamma[:, 1] * ~obs, minlength=n_skills) / np.maximum(known, EPS)
+        p_init = np.where(active, np.clip(new_init, lo, 1 - lo), p_init)
+        p_transit = np.where(active, np.clip(new_transit, lo, 1 - lo), p_transit)
+        p_guess = np.where(active, np.clip(new_guess, lo, cfg.max_guess), p_guess)
+        p_slip = np.where(active, np.clip(new_slip, lo, cfg.max_slip), p_slip)
+    params = np.stack([p_init, p_transit, p_slip, p_guess], axis=1)
+    return params, log_likelihood, iterations
+
+
+def _fit_bkt_task(task):
+    return _fit_bkt_group(*task)
+
+
+def fit_bkt(
+    events: pd.DataFrame,
+    config: Optional[BKTFitConfig] = None,
+    processes: Optional[int] = None,
+) -> BKTFitResult:
+    """Fit per-skill :class:`BKTParams` by EM (Baum-Welch) on response sequences.
+
+    *events* has ``learner``, ``skill`` and ``correct`` columns in
+    chronological order; each (learner, skill) pair is one sequence.  With
+    ``processes > 1`` the skills are split into that many groups of similar
+    response counts and fitted in a process pool.
+    """
+    cfg = config or BKTFitConfig()
+    learners, _ = pd.factorize(events["learner"])
+    skills, skill_names = pd.factorize(events["skill"])
+    correct = events["correct"].to_numpy() != 0
+    skill_names = [str(s) for s in skill_names]
+    counts = np.bincount(skills, minlength=len(skill_names))
+
+    # balance the skill groups by response count, largest skills first
+    n_groups = max(1, min(processes or 1, len(skill_names)))
+    groups: List[List[int]] = [[] for _ in range(n_groups)]
+    load = np.zeros(n_groups)
+    for code in np.argsort(-counts, kind="stable"):
+        g = int(np.argmin(load))
+        groups[g].append(int(code))
+        load[g] += counts[code]
+
+    tasks = []
+    for members in groups:
+        local = np.full(len(skill_names), -1)
+        local[members] = np.arange(len(members))
+        rows = np.flatnonzero(local[skills] >= 0)
+        tasks.append((learners[rows], local[skills[rows]], correct[rows], len(members), cfg))
+    if n_groups > 1:
+        with ProcessPoolExecutor(max_workers=n_groups) as pool:
+            fitted = list(pool.map(_fit_bkt_task, tasks))
+    else:
+        fitted = [_fit_bkt_task(tasks[0])]
+
+    result = BKTFitResult(params={}, log_likelihood={}, n_responses={}, n_sequences={})
+    for members, (params, log_likelihood, iterations) in zip(groups, fitted):
+        result.iterations = max(result.iterations, iterations)
+        for local, code in enumerate(members):
+            name = skill_names[code]
+            result.params[name] = BKTParams(*(float(v) for v in params[local]))
+            result.log_likelihood[name] = float(log_likelihood[local])
+            result.n_responses[name] = int(counts[code])
+    n_seq = events.groupby("skill")["learner"].nunique()
+    result.n_sequences = {str(s): int(v) for s, v in n_seq.items()}
+    return result
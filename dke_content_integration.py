@@ -35,7 +35,7 @@ import os
 
 # Import DKE components
 from dke import (
-    DKEPipeline, DKEResult, ItemBank, Item, CATConfig, 
+    DKEPipeline, DKEResult, ItemBank, Item, CATConfig, CATState,
     BKTParams, SelfAssessment, Rubric, LLMGrader
 )
 
@@ -243,9 +243,10 @@ class AdaptiveLearningPipeline:
         self_assess: SelfAssessment,
         concept_edges: List[Tuple[str, str]],
         required_edges: List[Tuple[str, str]],
-        oracle: Callable[[Item], int],
+        oracle: Optional[Callable[[Item], int]] = None,
         user_profile: Optional[UserProfile] = None,
-        context: Optional[str] = None
+        context: Optional[str] = None,
+        cat_state: Optional[CATState] = None
     ) -> RecommendationBundle:
         """
         Run complete pipeline: assessment → gap analysis → content recommendation.
@@ -260,6 +261,8 @@ class AdaptiveLearningPipeline:
             oracle: Function that simulates user responses to adaptive test items
             user_profile: Optional user profile for personalization
             context: Optional context to refine content search
+            cat_state: Finished step-wise CAT session to score instead of
+                running the test through ``oracle``
             
         Returns:
             RecommendationBundle with assessment results and content recommendations
@@ -269,14 +272,26 @@ class AdaptiveLearningPipeline:
         if not self.dke:
             raise ValueError("DKE pipeline not initialized. Please provide a DKEPipeline instance.")
         
-        dke_result = self.dke.run(
-            response_free_text=response_free_text,
-            reference_text=reference_text,
-            self_assess=self_assess,
-            concept_edges=concept_edges,
-            required_edges=required_edges,
-            oracle=oracle
-        )
+        if cat_state is not None:
+            dke_result = self.dke.evaluate(
+                cat_state,
+                response_free_text=response_free_text,
+                reference_text=reference_text,
+                self_assess=self_assess,
+                concept_edges=concept_edges,
+                required_edges=required_edges
+            )
+        elif oracle is not None:
+            dke_result = self.dke.run(
+                response_free_text=response_free_text,
+                reference_text=reference_text,
+                self_assess=self_assess,
+                concept_edges=concept_edges,
+                required_edges=required_edges,
+                oracle=oracle
+            )
+        else:
+            raise ValueError("Provide either an oracle or a finished cat_state.")
         
         # Step 2: Analyze gaps
         learning_gaps = self.adapter.identify_learning_gaps(dke_result)
@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pytest
+
+from dke import CATConfig, CATEngine, CATState, Item, ItemBank
+
+
+def _bank():
+    rng = np.random.default_rng(0)
+    return ItemBank({
+        f"i{j}": Item(f"i{j}", "s", float(rng.uniform(0.6, 2.0)), float(rng.normal()), "") for j in range(40)
+    })
+
+
+def _answer(engine, pattern):
+    state = CATState()
+    for item_id, u in pattern:
+        item = engine.bank.items[item_id]
+        state.record(item, u, engine.bank.row_of[item_id])
+        state.theta, state.se = engine.estimate(state, item, u)
+    return state
+
+
+def _fine_posterior(bank, pattern, mean=0.0, sd=1.0):
+    theta = np.linspace(mean - 8 * sd, mean + 8 * sd, 20001)
+    log_post = -0.5 * ((theta - mean) / sd) ** 2
+    for item_id, u in pattern:
+        item = bank.items[item_id]
+        p = 1 / (1 + np.exp(-item.a * (theta - item.b)))
+        log_post += np.log(p if u else 1 - p)
+    return theta, log_post
+
+
+PATTERN = [("i0", 1), ("i1", 0), ("i2", 1), ("i3", 1), ("i4", 0), ("i5", 1)]
+
+
+def test_eap_matches_the_posterior_mean_and_sd():
+    bank = _bank()
+    state = _answer(CATEngine(bank, CATConfig(estimator="eap")), PATTERN)
+    theta, log_post = _fine_posterior(bank, PATTERN)
+    w = np.exp(log_post - log_post.max())
+    w /= w.sum()
+    mean = float(w @ theta)
+
+    assert state.theta == pytest.approx(mean, abs=1e-3)
+    assert state.se == pytest.approx(math.sqrt(float(w @ (theta - mean) ** 2)), abs=1e-3)
+
+
+def test_map_matches_the_posterior_mode():
+    bank = _bank()
+    state = _answer(CATEngine(bank, CATConfig(estimator="map", prior_mean=0.5, prior_sd=0.8)), PATTERN)
+    theta, log_post = _fine_posterior(bank, PATTERN, mean=0.5, sd=0.8)
+
+    assert state.theta == pytest.approx(theta[np.argmax(log_post)], abs=0.02)
+
+
+def test_incremental_posterior_equals_a_replay():
+    bank = _bank()
+    engine = CATEngine(bank, CATConfig(estimator="eap"))
+    state = _answer(engine, PATTERN)
+    incremental = (state.theta, state.se)
+
+    assert engine.replay_posterior(state) == pytest.approx(incremental)
+
+
+@pytest.mark.parametrize("u", [0, 1])
+def test_eap_is_finite_for_all_correct_or_all_wrong(u):
+    bank = _bank()
+    pattern = [(f"i{j}", u) for j in range(8)]
+    eap = _answer(CATEngine(bank, CATConfig(estimator="eap")), pattern)
+    mle = _answer(CATEngine(bank, CATConfig(estimator="mle")), pattern)
+
+    assert math.isfinite(eap.theta) and 0 < eap.se < 1
+    assert (eap.theta > 0) == bool(u)
+    assert abs(mle.theta) > abs(eap.theta)
+
+
+def test_unknown_estimator_is_rejected():
+    with pytest.raises(ValueError):
+        CATEngine(_bank(), CATConfig(estimator="wle"))
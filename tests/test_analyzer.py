@@ -0,0 +1,46 @@
+import pytest
+
+from Project import Analyzer, LearningContent, PorterStemmer, VectorDBManager
+
+# Examples from Porter (1980), "An algorithm for suffix stripping".
+PORTER_EXAMPLES = [
+    ("caresses", "caress"), ("ponies", "poni"), ("cats", "cat"), ("agreed", "agre"), ("plastered", "plaster"),
+    ("motoring", "motor"), ("sing", "sing"), ("conflated", "conflat"), ("sized", "size"), ("hopping", "hop"),
+    ("falling", "fall"), ("hissing", "hiss"), ("failing", "fail"), ("filing", "file"), ("happy", "happi"),
+    ("sky", "sky"), ("relational", "relat"), ("conditional", "condit"), ("rational", "ration"),
+    ("digitizer", "digit"), ("vietnamization", "vietnam"), ("operator", "oper"), ("decisiveness", "decis"),
+    ("hopefulness", "hope"), ("sensibiliti", "sensibl"), ("triplicate", "triplic"), ("electrical", "electr"),
+    ("goodness", "good"), ("allowance", "allow"), ("adjustable", "adjust"), ("replacement", "replac"),
+    ("adoption", "adopt"), ("communism", "commun"), ("effective", "effect"), ("bowdlerize", "bowdler"),
+    ("probate", "probat"), ("rate", "rate"), ("cease", "ceas"), ("controll", "control"), ("roll", "roll"),
+    ("generalizations", "gener"),
+]
+
+
+@pytest.mark.parametrize("word, stem", PORTER_EXAMPLES)
+def test_porter_stems_match_the_paper(word, stem):
+    assert PorterStemmer().stem(word) == stem
+
+
+def test_analyzer_drops_stop_words_and_memoizes_stems():
+    analyzer = Analyzer()
+    assert analyzer.analyze("The Running of the Tests, and testing!") == ["run", "test", "test"]
+    analyzer.analyze("running tests")
+    assert (analyzer.cache_info().misses, analyzer.cache_info().hits) == (3, 2)
+
+    plain = Analyzer(stop_words=None, stemmer=None)
+    assert plain.analyze("The Running") == ["the", "running"]
+    with pytest.raises(ValueError):
+        Analyzer(stemmer="snowball")
+
+
+def test_queries_match_other_inflections():
+    manager = VectorDBManager()
+    manager.add_contents([
+        LearningContent(
+            id="c1", title="Optimizing queries", content_type="article", source="docs", url="u",
+            description="How the optimizer plans joins", difficulty="advanced", duration_minutes=10,
+        )
+    ])
+
+    assert [content.id for content, _ in manager.search("optimize query", 5, "bm25")] == ["c1"]
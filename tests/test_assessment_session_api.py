@@ -0,0 +1,94 @@
+import importlib.util
+import os
+
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+pytest.importorskip("flask_cors")
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "webapp", "backend", "app.py")
+
+
+@pytest.fixture(scope="module")
+def backend(tmp_path_factory):
+    os.environ["DATABASE_URI"] = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    spec = importlib.util.spec_from_file_location("learnora_backend", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    with module.app.app_context():
+        module.db.create_all()
+    yield module
+    os.environ.pop("DATABASE_URI")
+
+
+@pytest.fixture
+def client(backend):
+    client = backend.app.test_client()
+    name = f"learner{id(client)}"
+    response = client.post("/api/auth/register", json={"username": name, "email": f"{name}@example.org", "password": "pw"})
+    assert response.status_code in (200, 201)
+    return client
+
+
+def _start(client):
+    response = client.post("/api/assessment/session")
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def test_session_routes_require_login(backend):
+    assert backend.app.test_client().post("/api/assessment/session").status_code == 401
+
+
+def test_answering_every_item_completes_the_session(client):
+    started = _start(client)
+    session_id, item = started["session_id"], started["item"]
+    resumed = client.get(f"/api/assessment/session/{session_id}").get_json()
+    assert resumed["item"]["id"] == item["id"] and resumed["answered"] == 0
+
+    for answered in range(1, started["max_items"] + 1):
+        body = client.post(f"/api/assessment/session/{session_id}/answer", json={"item_id": item["id"], "correct": True})
+        assert body.status_code == 200
+        payload = body.get_json()
+        assert payload["answered"] == answered
+        if payload["completed"]:
+            break
+        item = payload["item"]
+    assert payload["completed"]
+
+    again = client.post(f"/api/assessment/session/{session_id}/answer", json={"item_id": item["id"], "correct": True})
+    assert again.status_code == 409
+
+
+def test_answer_must_name_the_pending_item(client):
+    started = _start(client)
+    url = f"/api/assessment/session/{started['session_id']}/answer"
+
+    assert client.post(url, json={"correct": True}).status_code == 400
+    stale = client.post(url, json={"item_id": "not-the-pending-item", "correct": True})
+    assert stale.status_code == 409
+    assert stale.get_json()["pending_item_id"] == started["item"]["id"]
+    assert client.get(f"/api/assessment/session/{started['session_id']}").get_json()["answered"] == 0
+
+
+def test_concurrent_write_is_rejected(backend, client, monkeypatch):
+    started = _start(client)
+    session_id = started["session_id"]
+    from_dict = backend.CATState.from_dict
+
+    def from_dict_then_concurrent_write(data, bank):
+        # another request stores the session between this one's read and write
+        with backend.db.engine.begin() as connection:
+            connection.execute(
+                backend.db.text("UPDATE assessment_session SET version = version + 1 WHERE id = :id"), {"id": session_id}
+            )
+        return from_dict(data, bank)
+
+    monkeypatch.setattr(backend.CATState, "from_dict", from_dict_then_concurrent_write)
+    response = client.post(
+        f"/api/assessment/session/{session_id}/answer", json={"item_id": started["item"]["id"], "correct": True}
+    )
+    monkeypatch.undo()
+
+    assert response.status_code == 409
+    assert client.get(f"/api/assessment/session/{session_id}").get_json()["answered"] == 0
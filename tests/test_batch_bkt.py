@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dke import BatchKnowledgeTracer, BKTParams, KnowledgeTracer
+
+SKILLS = ["algebra", "geometry", "probability"]
+PARAMS = {
+    "algebra": BKTParams(p_init=0.1, p_transit=0.3, p_slip=0.05, p_guess=0.25),
+    "geometry": BKTParams(p_init=0.4, p_transit=0.1, p_slip=0.15, p_guess=0.2),
+}
+
+
+def _events(count, learners=40, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "learner": [f"l{i}" for i in rng.integers(0, learners, count)],
+        "skill": rng.choice(SKILLS, count),
+        "correct": rng.integers(0, 2, count),
+    })
+
+
+def _per_learner(events):
+    tracers = {}
+    for learner, skill, correct in events.itertuples(index=False):
+        tracers.setdefault(learner, KnowledgeTracer(SKILLS, PARAMS)).update(skill, correct)
+    return tracers
+
+
+def test_batch_update_equals_replaying_each_learner():
+    events = _events(5000)
+    batch = BatchKnowledgeTracer(SKILLS, PARAMS, capacity=4)
+    batch.replay(events, chunk_size=777)  # chunks split learners' sequences
+
+    expected = _per_learner(events)
+    assert len(batch) == len(expected)
+    for learner, tracer in expected.items():
+        got = batch.mastery_snapshot(learner)
+        for skill in SKILLS:
+            assert got[skill] == pytest.approx(tracer.state.mastery[skill], abs=1e-12)
+
+
+def test_unseen_learners_start_at_the_skill_priors():
+    batch = BatchKnowledgeTracer(SKILLS, PARAMS)
+    batch.apply(["a"], ["algebra"], [1])
+
+    assert batch.mastery_snapshot("b") == {"algebra": 0.1, "geometry": 0.4, "probability": BKTParams().p_init}
+    assert batch.mastery_snapshot("a")["geometry"] == 0.4
+    assert batch.mastery_snapshot("a")["algebra"] > 0.1
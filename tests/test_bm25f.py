@@ -0,0 +1,50 @@
+import pytest
+
+from Project import LearningContent, VectorDBManager
+
+
+def _doc(content_id, title, description, tags=()):
+    return LearningContent(
+        id=content_id, title=title, content_type="article", source="docs", url="u", description=description,
+        difficulty="beginner", duration_minutes=10, tags=list(tags),
+    )
+
+
+DOCS = [
+    _doc("in-title", "Graph algorithms", "A walk through shortest paths and search.", tags=["cs"]),
+    _doc("in-description", "Algorithms course", "We cover graph traversal and spanning trees.", tags=["cs"]),
+    _doc("in-tags", "Algorithms notes", "Lecture notes on classic problems.", tags=["graph"]),
+    _doc("unrelated", "Cooking basics", "Knife skills and sauces.", tags=["food"]),
+]
+
+
+def _order(manager, query="graph"):
+    return [content.id for content, _ in manager.search(query, 10, "bm25")]
+
+
+def test_title_and_tag_matches_outrank_description_matches():
+    manager = VectorDBManager()
+    manager.add_contents(DOCS)
+
+    assert _order(manager) == ["in-title", "in-tags", "in-description"]
+
+
+def test_changing_field_weights_reranks_without_reindexing():
+    manager = VectorDBManager()
+    manager.add_contents(DOCS)
+    weights = {"title": 0.5, "tags": 0.5, "description": 4.0, "prerequisites": 0.5}
+    manager.set_field_weights(weights)
+
+    assert _order(manager)[0] == "in-description"
+    fresh = VectorDBManager(field_weights=weights)
+    fresh.add_contents(DOCS)
+    expected = {content.id: score for content, score in fresh.search("graph", 10, "bm25")}
+    for content, score in manager.search("graph", 10, "bm25"):
+        assert score == pytest.approx(expected[content.id])
+
+
+def test_zero_weight_field_does_not_match():
+    manager = VectorDBManager(field_weights={"title": 1.0, "tags": 0.0, "description": 1.0, "prerequisites": 0.0})
+    manager.add_contents(DOCS)
+
+    assert "in-tags" not in _order(manager)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from dke import Item, ItemBank
+from dke_calibration import CalibrationConfig, ResponseLog, calibrate_2pl
+
+
+def _simulate(n_learners=3000, n_items=25, seed=0, missing=0.0):
+    rng = np.random.default_rng(seed)
+    a, b = rng.uniform(0.7, 2.0, n_items), rng.normal(0, 1, n_items)
+    theta = rng.normal(0, 1, n_learners)
+    p = 1 / (1 + np.exp(-a * (theta[:, None] - b)))
+    matrix = (rng.random(p.shape) < p).astype(float)
+    matrix[rng.random(p.shape) < missing] = np.nan
+    return matrix, a, b
+
+
+def test_recovers_simulated_item_parameters():
+    matrix, a, b = _simulate(missing=0.3)
+    result = calibrate_2pl(ResponseLog.from_matrix(matrix))
+
+    assert result.converged
+    assert np.sqrt(np.mean((result.b - b) ** 2)) < 0.15
+    assert np.sqrt(np.mean((result.a - a) ** 2)) < 0.2
+    assert np.corrcoef(result.a, a)[0, 1] > 0.9
+    assert result.n_responses.sum() == np.count_nonzero(~np.isnan(matrix))
+    assert np.all(np.diff(result.log_likelihood) > -1e-6)
+
+
+def test_stream_and_matrix_logs_calibrate_alike():
+    matrix, _, _ = _simulate(n_learners=500, n_items=8, seed=1, missing=0.2)
+    rows = [
+        (f"l{i}", f"i{j}", int(matrix[i, j]))
+        for i in range(matrix.shape[0]) for j in range(matrix.shape[1]) if not np.isnan(matrix[i, j])
+    ]
+    from_stream = ResponseLog.from_stream(rows, chunk_size=97)
+    from_matrix = ResponseLog.from_matrix(matrix, item_ids=[f"i{j}" for j in range(8)])
+    config = CalibrationConfig(max_iter=30)
+
+    assert len(from_stream) == len(from_matrix) == len(rows)
+    streamed, dense = calibrate_2pl(from_stream, config), calibrate_2pl(from_matrix, config)
+    order = [streamed.item_ids.index(item_id) for item_id in dense.item_ids]
+    np.testing.assert_allclose(streamed.b[order], dense.b, atol=1e-9)
+
+
+def test_extreme_items_stay_finite_and_results_fill_a_bank():
+    matrix, _, _ = _simulate(n_learners=300, n_items=5, seed=2)
+    matrix[:, 0] = 1.0  # everyone answered item 0 correctly
+    result = calibrate_2pl(ResponseLog.from_matrix(matrix, item_ids=["easy", "i1", "i2", "i3", "i4"]))
+    assert np.all(np.isfinite(result.a)) and np.all(np.isfinite(result.b))
+    assert result.b[0] == pytest.approx(result.b.min())
+
+    existing = ItemBank({"i1": Item("i1", "algebra", 1.0, 0.0, "Solve x + 1 = 2")})
+    bank = result.to_item_bank(existing, skills={"easy": "warmup"})
+    assert bank.items["i1"].text == "Solve x + 1 = 2" and bank.items["i1"].b == pytest.approx(result.b[1])
+    assert bank.items["easy"].skill == "warmup" and bank.items["i2"].skill == "general"
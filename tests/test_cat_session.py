@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from dke import BKTParams, CATConfig, CATEngine, CATState, DKEPipeline, SelfAssessment, _build_demo_bank
+
+
+def _answered_state(engine, answers):
+    state = engine.start_session()
+    for u in answers:
+        engine.next_item(state)
+        engine.submit(state, u)
+    engine.next_item(state)
+    return state
+
+
+def test_state_round_trips_through_json():
+    bank, _ = _build_demo_bank()
+    engine = CATEngine(bank, CATConfig(max_items=8, estimator="eap"))
+    state = _answered_state(engine, [1, 0, 1])
+    restored = CATState.from_dict(json.loads(json.dumps(state.to_dict(bank))), bank)
+
+    assert restored.asked == state.asked
+    assert restored.responses == state.responses
+    assert restored.pending == state.pending
+    assert restored.asked_mask.sum() == 3
+    assert engine.submit(restored, 1) == engine.submit(state, 1)
+
+
+@pytest.mark.parametrize("pending", [-1, 10_000, "answered"])
+def test_tampered_pending_item_is_rejected(pending):
+    bank, _ = _build_demo_bank()
+    engine = CATEngine(bank, CATConfig(max_items=8))
+    data = _answered_state(engine, [1, 1]).to_dict(bank)
+    data["pending"] = data["order"][0] if pending == "answered" else pending
+
+    with pytest.raises(ValueError):
+        CATState.from_dict(data, bank)
+
+
+def test_evaluations_do_not_share_mastery():
+    bank, skills = _build_demo_bank()
+    pipeline = DKEPipeline(bank, CATConfig(max_items=6, estimator="eap"), skills, BKTParams(p_init=0.3))
+    right = _answered_state(pipeline.cat, [1] * 6)
+    wrong = _answered_state(pipeline.cat, [0] * 6)
+    args = ("", "", SelfAssessment(confidence={}), [], [])
+
+    alone = pipeline.evaluate(wrong, *args).mastery
+    pipeline.evaluate(right, *args)
+    assert pipeline.evaluate(wrong, *args).mastery == alone
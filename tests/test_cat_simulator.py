@@ -0,0 +1,33 @@
+import numpy as np
+
+from dke import CATConfig, CATSimulator, Item, ItemBank
+
+
+def make_bank(size, seed=0):
+    rng = np.random.default_rng(seed)
+    a, b = rng.uniform(0.5, 2.0, size), rng.normal(0.0, 1.2, size)
+    return ItemBank({f"i{j}": Item(f"i{j}", "s", float(a[j]), float(b[j]), "") for j in range(size)})
+
+
+def test_eap_keeps_the_estimates_bounded():
+    report = CATSimulator(make_bank(500), CATConfig(max_items=10, se_stop=0.3, estimator="eap")).run(4000, seed=1)
+    error = report.theta - report.true_theta
+
+    assert abs(error.mean()) < 0.05
+    assert np.sqrt(np.mean(error ** 2)) < 0.5
+
+
+def test_grid_walk_is_the_default_and_tracks_exact_selection():
+    bank = make_bank(2000)
+    config = CATConfig(max_items=12, se_stop=0.3, estimator="eap")
+    grid, exact = CATSimulator(bank, config), CATSimulator(bank, config, exact=True)
+
+    assert grid.index is not None and exact.index is None
+    assert exact.batch_size * len(bank) <= CATSimulator.CHUNK_CELLS
+    rmse = [np.sqrt(np.mean((r.theta - r.true_theta) ** 2)) for r in (grid.run(2000, seed=3), exact.run(2000, seed=3))]
+    assert abs(rmse[0] - rmse[1]) < 0.05
+
+
+def test_simulator_defaults_to_eap_without_changing_the_engine_default():
+    assert CATConfig().estimator == "mle"
+    assert CATSimulator(make_bank(50)).cfg.estimator == "eap"
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from Project import CompressedPosting, LearningContent, VectorDBManager
+
+
+@pytest.mark.parametrize(
+    "count, universe",
+    [(1, 10), (128, 128), (129, 1000), (777, 2000), (5000, 5000), (20000, 60000), (3000, 2**31 - 1)],
+)
+def test_rows_and_values_round_trip(count, universe):
+    rng = np.random.default_rng(count)
+    rows = np.sort(rng.choice(universe, count, replace=False)).astype(np.int32)
+    freqs = rng.integers(1, 300, count).astype(np.uint16)
+    weights = rng.random(count).astype(np.float16)
+    counts, impacts = CompressedPosting(rows, freqs), CompressedPosting(rows, weights)
+
+    assert counts.width in CompressedPosting.WIDTHS
+    np.testing.assert_array_equal(counts.decode()[0], rows)
+    np.testing.assert_array_equal(counts.decode()[1], freqs)
+    np.testing.assert_allclose(impacts.decode()[1], weights, atol=impacts.scale * 0.501)
+
+    targets = np.sort(rng.choice(universe, min(200, universe), replace=False))
+    present = np.isin(targets, rows)
+    found, values = counts.lookup(targets)
+    np.testing.assert_array_equal(found, targets[present])
+    np.testing.assert_array_equal(values, freqs[np.searchsorted(rows, found)])
+
+
+def test_dense_list_is_bit_packed_with_exceptions():
+    rng = np.random.default_rng(0)
+    rows = np.flatnonzero(rng.random(20000) < 0.8)
+    rows[-1] = 10_000_000  # one huge gap becomes an exception, not a wide list
+    posting = CompressedPosting(rows, rng.random(len(rows)).astype(np.float16))
+
+    assert posting.width <= 4
+    assert 1 <= len(posting.exception_rows) < len(rows) // 50
+    np.testing.assert_array_equal(posting.rows(), rows)
+    plain = rows.astype(np.int32).nbytes + 2 * len(rows)  # int32 rows + float16 weights
+    assert posting.nbytes < plain / 3
+
+
+def test_compressed_index_ranks_like_the_plain_one():
+    rng = np.random.default_rng(1)
+    words = np.array(["python", "tutorial", "data", "web"] + [f"w{i}" for i in range(300)])
+    docs = [
+        LearningContent(
+            id=f"c{i}", title=" ".join(rng.choice(words, 6)), content_type="article", source="docs", url="u",
+            description=" ".join(rng.choice(words, 40)), difficulty="beginner", duration_minutes=10,
+        )
+        for i in range(3000)
+    ]
+    plain, packed = VectorDBManager(), VectorDBManager(compress_postings=True)
+    plain.add_contents(docs)
+    packed.add_contents(docs)
+
+    for query in ("python tutorial", "data web w7", "w12"):
+        expected = dict((content.id, score) for content, score in plain.search(query, 50, "bm25"))
+        got = dict((content.id, score) for content, score in packed.search(query, 50, "bm25"))
+        assert len(expected.keys() & got.keys()) >= 45
+        for content_id in expected.keys() & got.keys():
+            assert got[content_id] == pytest.approx(expected[content_id], rel=0.01)
@@ -0,0 +1,40 @@
+import threading
+
+from Project import BackgroundDiscoveryWorker
+
+
+def test_submit_right_after_stop_is_not_lost():
+    discovered = []
+    worker = BackgroundDiscoveryWorker(lambda query, sources, namespace: discovered.append(query) or 0)
+
+    for i in range(200):
+        assert worker.submit(f"first {i}")
+        assert worker.wait(2)
+        worker.stop(timeout=0)  # the thread may be exiting while the next query arrives
+        assert worker.submit(f"second {i}")
+        assert worker.wait(2), f"query submitted after stop was dropped on round {i}"
+
+    assert len(discovered) == 400
+    worker.stop(timeout=2)
+
+
+def test_duplicate_queries_are_fetched_once_and_the_flag_clears():
+    release, calls = threading.Event(), []
+
+    def discover(query, sources, namespace):
+        calls.append((query, namespace))
+        release.wait(2)
+        return 1
+
+    worker = BackgroundDiscoveryWorker(discover)
+    assert worker.submit("Python  Basics", namespace="n1")
+    assert not worker.submit("python basics", namespace="n1")
+    assert worker.submit("python basics", namespace="n2")
+    assert worker.queued("PYTHON basics", namespace="n1")
+
+    release.set()
+    assert worker.wait(2)
+    assert not worker.queued("python basics", namespace="n1")
+    assert calls == [("python basics", "n1"), ("python basics", "n2")]
+    assert worker.completed == 2
+    worker.stop(timeout=2)
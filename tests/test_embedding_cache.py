@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from Project import EmbeddingCache, EmbeddingProvider, HashingNgramEmbeddingProvider, LearningContent, VectorDBManager
+
+
+class CountingProvider(HashingNgramEmbeddingProvider):
+    def __init__(self, **kwargs):
+        super().__init__(dim=32, n_buckets=1024, **kwargs)
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return super().encode(texts)
+
+
+def _docs(count):
+    return [
+        LearningContent(
+            id=f"c{i}", title=f"Lesson {i} on topic {i % 7}", content_type="article", source="docs", url="u",
+            description=f"Notes for unit {i}", difficulty="beginner", duration_minutes=10,
+        )
+        for i in range(count)
+    ]
+
+
+def test_provider_must_implement_encode():
+    class Incomplete(EmbeddingProvider):
+        dim = 4
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_cache_round_trips_and_grows_past_its_initial_capacity(tmp_path):
+    provider = HashingNgramEmbeddingProvider(dim=16, n_buckets=512)
+    cache = EmbeddingCache(str(tmp_path), provider, initial_capacity=4)
+    keys = [f"k{i}" for i in range(10)]
+    vectors = np.random.default_rng(0).standard_normal((10, 16)).astype(np.float32)
+    cache.put_many(keys[:3], vectors[:3])
+    cache.put_many(keys, vectors)
+
+    reopened = EmbeddingCache(str(tmp_path), provider)
+    assert len(reopened) == 10
+    found = reopened.get_many(["missing"] + keys)
+    assert sorted(found) == list(range(1, 11))
+    np.testing.assert_array_equal(np.stack([found[i] for i in range(1, 11)]), vectors)
+
+
+def test_cache_starts_over_for_a_different_provider(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), HashingNgramEmbeddingProvider(dim=16, n_buckets=512))
+    cache.put_many(["k"], np.ones((1, 16), dtype=np.float32))
+
+    assert len(EmbeddingCache(str(tmp_path), HashingNgramEmbeddingProvider(dim=16, n_buckets=512, seed=1))) == 0
+
+
+def test_reindexing_reuses_cached_vectors(tmp_path):
+    first = CountingProvider()
+    manager = VectorDBManager(embedding_provider=first, embedding_cache=EmbeddingCache(str(tmp_path), first),
+                              embedding_batch_size=8)
+    manager.add_contents(_docs(20))
+    assert first.encoded == 20
+
+    second = CountingProvider()
+    cache = EmbeddingCache(str(tmp_path), second)
+    VectorDBManager(embedding_provider=second, embedding_cache=cache).add_contents(_docs(25))
+    assert second.encoded == 5
+    assert len(cache) == 25
@@ -0,0 +1,53 @@
+import random
+from collections import Counter
+
+import pytest
+
+from Project import LearningContent, VectorDBManager
+
+
+def _corpus(count, seed=0):
+    rng = random.Random(seed)
+    tags = ["python", "web", "ml", "sql", "cloud"]
+    return [
+        LearningContent(
+            id=f"c{i}", title=rng.choice(["python basics", "web apps", "data"]), url="u",
+            content_type=rng.choice(["video", "article", "course"]), source=rng.choice(["docs", "blog"]),
+            description=rng.choice(["intro python", "advanced topics", "python data tooling"]),
+            difficulty=rng.choice(["beginner", "intermediate", "advanced"]), duration_minutes=10,
+            tags=rng.sample(tags, rng.randint(0, 3)),
+        )
+        for i in range(count)
+    ]
+
+
+def test_facets_count_every_match_not_just_the_top_k():
+    docs = _corpus(400)
+    manager = VectorDBManager()
+    manager.add_contents(docs)
+    everything = manager.search("python", 1000, "bm25")
+    results = manager.search("python", 5, "bm25", facets=["content_type", "difficulty", "source", "tags"])
+
+    matched = [content for content, _ in everything]
+    assert len(results) == 5 and results.total == len(matched)
+    assert results.facets["content_type"] == Counter(c.content_type for c in matched)
+    assert results.facets["difficulty"] == Counter(c.difficulty for c in matched)
+    assert results.facets["source"] == Counter(c.source for c in matched)
+    assert results.facets["tags"] == Counter(tag for c in matched for tag in c.tags)
+
+
+def test_facet_limit_keeps_the_most_frequent_values_in_order():
+    manager = VectorDBManager()
+    manager.add_contents(_corpus(400, seed=1))
+    facets = manager.search("python", 5, "bm25", facets=["tags"], facet_limit=2).facets["tags"]
+    full = manager.search("python", 5, "bm25", facets=["tags"]).facets["tags"]
+
+    assert list(facets.items()) == list(full.items())[:2]
+    assert list(full.values()) == sorted(full.values(), reverse=True)
+
+
+def test_unknown_facet_is_rejected():
+    manager = VectorDBManager()
+    manager.add_contents(_corpus(10))
+    with pytest.raises(ValueError):
+        manager.search("python", 5, facets=["author"])
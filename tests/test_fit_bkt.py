@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dke import BKTParams
+from dke_calibration import BKTFitConfig, fit_bkt
+
+TRUE = {
+    "fractions": BKTParams(p_init=0.2, p_transit=0.15, p_slip=0.1, p_guess=0.2),
+    "decimals": BKTParams(p_init=0.5, p_transit=0.05, p_slip=0.05, p_guess=0.25),
+}
+
+
+def _simulate(learners=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for learner in range(learners):
+        known = {skill: rng.random() < p.p_init for skill, p in TRUE.items()}
+        lengths = {skill: int(rng.integers(3, 20)) for skill in TRUE}
+        # interleave the learner's skills, as a real practice log would
+        order = rng.permutation([skill for skill, n in lengths.items() for _ in range(n)])
+        for skill in order:
+            p = TRUE[skill]
+            correct = rng.random() < (1 - p.p_slip if known[skill] else p.p_guess)
+            rows.append((f"l{learner}", skill, int(correct)))
+            known[skill] = known[skill] or rng.random() < p.p_transit
+    return pd.DataFrame(rows, columns=["learner", "skill", "correct"])
+
+
+def _forward_log_likelihood(events, skill, p):
+    total = 0.0
+    for _, group in events[events["skill"] == skill].groupby("learner", sort=False):
+        known = p.p_init
+        for correct in group["correct"]:
+            likelihood = known * (1 - p.p_slip) + (1 - known) * p.p_guess
+            if not correct:
+                likelihood = 1 - likelihood
+            total += np.log(likelihood)
+            posterior = known * ((1 - p.p_slip) if correct else p.p_slip) / likelihood
+            known = posterior + (1 - posterior) * p.p_transit
+    return total
+
+
+def test_recovers_simulated_parameters():
+    events = _simulate()
+    result = fit_bkt(events)
+
+    for skill, expected in TRUE.items():
+        got = result.params[skill]
+        assert got.p_init == pytest.approx(expected.p_init, abs=0.05)
+        assert got.p_transit == pytest.approx(expected.p_transit, abs=0.04)
+        assert got.p_slip == pytest.approx(expected.p_slip, abs=0.04)
+        assert got.p_guess == pytest.approx(expected.p_guess, abs=0.04)
+        assert result.n_sequences[skill] == 2000
+        assert result.n_responses[skill] == int((events["skill"] == skill).sum())
+        assert result.log_likelihood[skill] == pytest.approx(_forward_log_likelihood(events, skill, got), rel=1e-6)
+
+
+def test_fit_does_not_depend_on_how_skills_are_grouped():
+    events = _simulate(learners=300, seed=1)
+    config = BKTFitConfig(max_iter=40)
+    alone, pooled = fit_bkt(events, config), fit_bkt(events, config, processes=2)
+
+    for skill in TRUE:
+        assert pooled.params[skill] == alone.params[skill]
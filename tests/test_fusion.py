@@ -0,0 +1,29 @@
+import numpy as np
+
+from Project import CandidateReRanker, ScoreFusion
+
+
+def test_minmax_keeps_the_weakest_match_positive():
+    bm25 = np.array([0.0, 1.0, 2.0, 4.0, 0.0])
+    dense = np.array([0.0, 0.0, 0.5, 1.0, 0.25])
+    rows, fused = ScoreFusion("minmax").fuse([bm25, dense], [0.5, 0.5])
+
+    assert rows.tolist() == [1, 2, 3, 4]
+    assert (fused > 0).all()
+    np.testing.assert_allclose(fused, [0.125, 0.5, 1.0, 0.125])
+
+
+def test_boost_can_lift_the_weakest_match():
+    rows, fused = ScoreFusion("minmax").fuse([np.array([1.0, 1.1, 4.0])], [1.0])
+    X = np.zeros((len(rows), len(CandidateReRanker.FEATURES)))
+    X[:, 0] = fused
+    X[0, 1:] = [1, 1, 1, 0, 1]  # every boost applies to the weakest match only
+    adjusted = CandidateReRanker().score(X)
+
+    assert adjusted[0] > adjusted[1]
+
+
+def test_minmax_single_match_scores_one():
+    rows, fused = ScoreFusion("minmax").fuse([np.array([0.0, 3.0])], [1.0])
+    assert rows.tolist() == [1]
+    assert fused.tolist() == [1.0]
@@ -0,0 +1,77 @@
+import random
+
+import numpy as np
+import pytest
+
+from Project import LearningContent, VectorDBManager
+
+WORDS = ["alpha", "beta", "gamma", "python", "java", "data", "web", "learn", "intro", "x1", "x2", "x3"]
+
+
+def _content(rng, i):
+    def text(n):
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+
+    return LearningContent(
+        id=f"d{i}", title=text(3), content_type=rng.choice(["video", "article"]), source=rng.choice(["s", "t"]),
+        url="u", description=text(rng.randint(0, 12)), difficulty=rng.choice(["beginner", "advanced"]),
+        duration_minutes=rng.randint(1, 60), tags=[rng.choice(WORDS) for _ in range(rng.randint(0, 3))],
+        prerequisites=[text(2)] if rng.random() < 0.5 else [],
+    )
+
+
+def _ranking(manager, query, strategy):
+    return [(content.id, round(score, 5)) for content, score in manager.search(query, 20, strategy)]
+
+
+def test_held_snapshot_is_not_changed_by_later_writes():
+    rng = random.Random(0)
+    manager = VectorDBManager()
+    manager.add_contents([_content(rng, i) for i in range(20)])
+    held = manager.snapshot()
+    before = _ranking(manager, "python data", "hybrid")
+
+    manager.add_contents([_content(rng, i) for i in range(10, 40)])
+
+    assert manager.generation == held.generation + 1
+    assert len(held.doc_ids) == 20 and len(manager.snapshot().doc_ids) == 40
+    again = [(c.id, round(s, 5)) for c, s in manager.search("python data", 20, "hybrid", snapshot=held)]
+    assert again == before
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_incremental_writes_match_a_fresh_build(compress):
+    rng = random.Random(1)
+    manager = VectorDBManager(positional=True, stats_drift=0, compress_postings=compress)
+    for _ in range(30):
+        # ids repeat, so later batches replace earlier versions of a document
+        manager.add_contents([_content(rng, rng.randint(0, 60)) for _ in range(rng.randint(1, 5))])
+    fresh = VectorDBManager(positional=True, compress_postings=compress)
+    fresh.add_contents(list(manager.contents.values()))
+    snap, expected = manager.snapshot(), fresh.snapshot()
+
+    assert snap.doc_ids == expected.doc_ids
+    assert snap.doc_freq == expected.doc_freq
+    assert snap.postings.keys() == expected.postings.keys()
+    np.testing.assert_allclose(snap.vector_norms, expected.vector_norms)
+    for query in ("python data", "alpha beta", "intro x1"):
+        for strategy in ("bm25", "dense", "hybrid"):
+            assert _ranking(manager, query, strategy) == _ranking(fresh, query, strategy)
+    assert manager.phrase_rows("python data").tolist() == fresh.phrase_rows("python data").tolist()
+
+
+def test_small_writes_defer_the_statistics_refold():
+    rng = random.Random(2)
+    manager = VectorDBManager(stats_drift=0.1)
+    manager.add_contents([_content(rng, i) for i in range(40)])
+    averages = manager.snapshot().field_avg_lengths
+
+    manager.add_contents([_content(rng, 40), _content(rng, 41)])
+    assert manager.snapshot().stale_rows == 2
+    assert manager.snapshot().field_avg_lengths == averages
+
+    manager.add_contents([_content(rng, i) for i in range(42, 46)])
+    assert manager.snapshot().stale_rows == 0
+    fresh = VectorDBManager()
+    fresh.add_contents(list(manager.contents.values()))
+    assert manager.snapshot().field_avg_lengths == pytest.approx(fresh.snapshot().field_avg_lengths)
@@ -0,0 +1,45 @@
+import numpy as np
+
+from dke import CATConfig, CATEngine, CATState, Item, ItemBank
+
+
+def _items(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        Item(f"i{j}", f"s{j % 3}", float(rng.uniform(0.5, 2.0)), float(rng.normal()), "")
+        for j in range(count)
+    ]
+
+
+def test_columns_mirror_the_items_through_growth_and_replacement():
+    bank = ItemBank()
+    for item in _items(50):
+        bank.add(item)
+    bank.add(Item("i7", "s9", 1.5, -0.25, "replaced"))
+
+    assert len(bank) == 50 and bank.ids[7] == "i7"
+    for row, item_id in enumerate(bank.ids):
+        item = bank.items[item_id]
+        assert (bank.a[row], bank.b[row]) == (item.a, item.b)
+        assert bank.skill_codes[row] == bank.skill_vocab[item.skill]
+    assert bank.skill_rows("s9").tolist() == [7]
+    assert 7 not in bank.skill_rows("s1").tolist()
+    assert [item.id for item in bank.by_skill("s0")] == [f"i{j}" for j in range(0, 50, 3)]
+    assert bank.revision == 1
+
+
+def test_vectorized_selection_picks_the_most_informative_unasked_item():
+    bank = ItemBank({item.id: item for item in _items(300, seed=1)})
+    engine = CATEngine(bank, CATConfig())
+    rng = np.random.default_rng(2)
+    for theta in (-2.0, -0.3, 0.0, 1.7):
+        state = CATState(theta=theta)
+        for item_id in rng.choice(bank.ids, 20, replace=False):
+            state.record(bank.items[item_id], 1, bank.row_of[item_id])
+        unasked = [item for item in bank.all() if item.id not in state.responses]
+
+        expected = max(unasked, key=lambda item: CATEngine.information(item, theta))
+        assert engine.select_next(state).id == expected.id
+        np.testing.assert_allclose(
+            engine.bank_information(theta), [CATEngine.information(item, theta) for item in bank.all()]
+        )
@@ -0,0 +1,94 @@
+import numpy as np
+
+from Project import IVFPQIndex
+
+
+def _clustered(rng, count, centers, spread):
+    picks = rng.integers(len(centers), size=count)
+    return (centers[picks] + spread * rng.normal(size=(count, centers.shape[1]))).astype(np.float32)
+
+
+def _recall_at_10(index, data, queries):
+    normed = data / np.linalg.norm(data, axis=1, keepdims=True)
+    hits = 0
+    for query in queries:
+        truth = set(np.argsort(-(normed @ query))[:10].tolist())
+        ids, _ = index.search(query, 10)
+        hits += len(truth & {int(content_id) for content_id in ids})
+    return hits / (10 * len(queries))
+
+
+def test_default_recall_on_clustered_data():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(50, 32))
+    data = _clustered(rng, 5000, centers, 0.35)
+    queries = _clustered(rng, 50, centers, 0.35)
+    index = IVFPQIndex(32)
+    index.add([str(i) for i in range(len(data))], data)
+
+    assert index.is_trained
+    assert _recall_at_10(index, data, queries) >= 0.95
+
+
+def test_full_probe_is_exact():
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(20, 16))
+    data = _clustered(rng, 2000, centers, 0.5)
+    queries = _clustered(rng, 20, centers, 0.5)
+    index = IVFPQIndex(16, nlist=16, nprobe=16, refine=50)
+    index.add([str(i) for i in range(len(data))], data)
+
+    assert _recall_at_10(index, data, queries) == 1.0
+
+
+def test_saved_index_keeps_its_seed_and_trains_like_the_original(tmp_path):
+    rng = np.random.default_rng(2)
+    data = _clustered(rng, 1200, rng.normal(size=(10, 16)), 0.4)
+    ids = [str(i) for i in range(len(data))]
+    original = IVFPQIndex(16, nlist=8, m=4, min_train=1000, seed=7)
+    original.add(ids[:600], data[:600])
+    path = str(tmp_path / "ann.npz")
+    original.save(path)
+    loaded = IVFPQIndex.load(path)
+    assert loaded.seed == 7 and not loaded.is_trained
+
+    for index in (original, loaded):
+        index.add(ids[600:], data[600:])
+    np.testing.assert_array_equal(loaded._model[0], original._model[0])
+    for query in data[:5]:
+        assert loaded.search(query, 10)[0] == original.search(query, 10)[0]
+
+
+def test_replaced_vectors_are_compacted_away():
+    rng = np.random.default_rng(3)
+    centers = rng.normal(size=(20, 16))
+    data = _clustered(rng, 2000, centers, 0.4)
+    ids = [str(i) for i in range(len(data))]
+    index = IVFPQIndex(16, nlist=16, m=4, compact_ratio=0.25)
+    index.add(ids, data)
+    for step in range(4):
+        moved = _clustered(rng, 300, centers, 0.4)
+        index.add(ids[step * 300:(step + 1) * 300], moved)
+        data[step * 300:(step + 1) * 300] = moved
+        assert index.tombstones <= 0.25 * (len(index) + index.tombstones)
+    index.remove(ids[-100:])
+
+    assert len(index) == 1900
+    assert index.search(data[5], 1)[0] == ["5"]
+    assert not {str(i) for i in range(1900, 2000)} & set(index.search(data[-1], 50)[0])
+    index.compact(retrain=True)
+    assert index.tombstones == 0 and index.is_trained
+    assert _recall_at_10(index, data[:1900], _clustered(rng, 30, centers, 0.4)) >= 0.9
+
+
+def test_compaction_can_be_left_to_the_caller():
+    rng = np.random.default_rng(4)
+    data = rng.normal(size=(300, 8)).astype(np.float32)
+    index = IVFPQIndex(8, m=2, compact_ratio=None)
+    index.add([str(i) for i in range(300)], data)
+    index.remove([str(i) for i in range(200)])
+
+    assert index.tombstones == 200
+    index.compact()
+    assert index.tombstones == 0 and len(index) == 100
+    assert index.search(data[250], 1)[0] == ["250"]
@@ -0,0 +1,61 @@
+from Project import LearningContent, VectorDBManager
+
+
+def _content(content_id, title, description="python basics"):
+    return LearningContent(
+        id=content_id, title=title, content_type="article", source="docs", url=f"https://example.org/{content_id}",
+        description=description, difficulty="beginner", duration_minutes=10,
+    )
+
+
+def test_suggest_ranks_terms_by_tenant_document_frequency():
+    manager = VectorDBManager()
+    manager.add_contents([_content(f"a{i}", f"pandas {i}", "pandas python") for i in range(5)], namespace="a")
+    manager.add_contents([_content(f"b{i}", f"pytest {i}", "pytest pyramid python") for i in range(9)], namespace="b")
+    manager.add_contents([_content("b0", "pytest zero", "pyramid")], namespace="b")
+
+    doc_freq = manager.snapshot().namespace_doc_freq["b"]
+    assert (doc_freq["pytest"], doc_freq["python"]) == (9, 8)  # replacing b0 dropped its "python"
+    assert manager.suggest("py", namespace="a")["completions"] == ["python"]
+    assert manager.suggest("py", namespace="b")["completions"] == ["pyramid", "pytest", "python"]
+
+
+def test_tenant_titles_past_other_tenants_titles_are_suggested():
+    manager = VectorDBManager()
+    manager.add_contents([_content(f"a{i:04d}", f"intro {i:04d}") for i in range(600)], namespace="a")
+    manager.add_contents([_content("b1", "intro zz tenant b")], namespace="b")
+
+    titles = manager.suggest("intro", namespace="b")["titles"]
+    assert titles == [{"id": "b1", "title": "intro zz tenant b"}]
+
+
+def test_namespaced_search_only_returns_that_tenants_contents():
+    manager = VectorDBManager()
+    manager.add_contents([_content(f"a{i}", f"python course {i}") for i in range(5)], namespace="a")
+    manager.add_contents([_content(f"b{i}", f"python lab {i}") for i in range(3)], namespace="b")
+    manager.add_contents([_content("a0", "python course 0")], namespace="b")  # shared by both tenants
+
+    for strategy in ("bm25", "dense", "hybrid"):
+        ids_a = {content.id for content, _ in manager.search("python", 50, strategy, namespace="a")}
+        ids_b = {content.id for content, _ in manager.search("python", 50, strategy, namespace="b")}
+        assert ids_a == {f"a{i}" for i in range(5)}
+        assert ids_b == {"a0", "b0", "b1", "b2"}
+    assert len(manager.search("python", 50, "bm25")) == 8
+    assert not manager.search("python", 50, "bm25", namespace="missing")
+    assert manager.namespaces() == {"a": 5, "b": 4}
+
+
+def test_namespace_stats_use_the_tenants_own_idf():
+    docs_a = [_content(f"a{i}", f"rust {i}", "rust ownership") for i in range(9)] + [_content("a9", "go", "go channels")]
+    docs_b = [_content(f"b{i}", f"go {i}", "go channels") for i in range(9)] + [_content("b9", "rust", "rust ownership")]
+    shared, scoped = VectorDBManager(), VectorDBManager(namespace_stats=True)
+    for manager in (shared, scoped):
+        manager.add_contents(docs_a, namespace="a")
+        manager.add_contents(docs_b, namespace="b")
+
+    def score(manager, query, namespace, content_id):
+        return dict((c.id, s) for c, s in manager.search(query, 20, "bm25", namespace=namespace))[content_id]
+
+    # corpus-wide both terms are equally common; within tenant a "go" is rare
+    assert score(shared, "go", "a", "a9") == score(shared, "rust", "b", "b9")
+    assert score(scoped, "go", "a", "a9") > score(scoped, "rust", "a", "a0")
@@ -0,0 +1,52 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from dke import CATConfig, CATEngine, Item, ItemBank, OpeningTree
+
+
+def _bank(count=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return ItemBank({
+        f"i{j}": Item(f"i{j}", "s", float(rng.uniform(0.5, 2.0)), float(rng.normal(0, 1.2)), "")
+        for j in range(count)
+    })
+
+
+def _play(engine, pattern):
+    state = engine.start_session()
+    for u in pattern:
+        if engine.next_item(state) is None:
+            break
+        engine.submit(state, u)
+    return state
+
+
+@pytest.mark.parametrize("estimator", ["mle", "eap", "map"])
+def test_sessions_with_the_tree_equal_sessions_without_it(estimator):
+    bank = _bank()
+    config = CATConfig(max_items=6, se_stop=0.0, estimator=estimator)
+    tree = OpeningTree.build(bank, config, depth=4)
+    plain, opened = CATEngine(bank, config), CATEngine(bank, config, opening=tree)
+
+    assert len(tree) == 2 ** 4 - 1
+    for pattern in itertools.product((0, 1), repeat=6):
+        expected, got = _play(plain, pattern), _play(opened, pattern)
+        assert got.asked == expected.asked
+        assert (got.theta, got.se) == pytest.approx((expected.theta, expected.se), abs=1e-9)
+
+
+def test_saved_tree_only_loads_for_its_bank_and_config(tmp_path):
+    bank, config = _bank(), CATConfig(max_items=6, estimator="eap")
+    path = str(tmp_path / "opening.json")
+    tree = OpeningTree.load_or_build(path, bank, config, depth=3)
+
+    loaded = OpeningTree.load(path, bank, config)
+    assert (loaded.items, loaded.children) == (tree.items, tree.children)
+    with pytest.raises(ValueError):
+        OpeningTree.load(path, bank, CATConfig(max_items=7, estimator="eap"))
+    bank.add(Item("i0", "s", 2.5, 0.0, "recalibrated"))
+    with pytest.raises(ValueError):
+        OpeningTree.load(path, bank, config)
+    assert OpeningTree.load_or_build(path, bank, config, depth=3).fingerprint != tree.fingerprint
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from Project import LearningContent, VectorDBManager
+
+
+def _doc(content_id, description):
+    return LearningContent(
+        id=content_id, title="", content_type="article", source="docs", url="u", description=description,
+        difficulty="beginner", duration_minutes=10,
+    )
+
+
+DOCS = [
+    _doc("exact", "neural network training"),
+    _doc("gap-one", "neural deep network training"),
+    _doc("gap-two", "neural large deep network training"),
+    _doc("reversed", "network neural training"),
+]
+
+
+@pytest.fixture
+def manager():
+    manager = VectorDBManager(positional=True)
+    manager.add_contents(DOCS)
+    return manager
+
+
+def _ids(manager, rows):
+    snap = manager.snapshot()
+    return {snap.doc_ids[row] for row in rows.tolist()}
+
+
+@pytest.mark.parametrize(
+    "slop, expected",
+    [(0, {"exact"}), (1, {"exact", "gap-one"}), (2, {"exact", "gap-one", "gap-two"})],
+)
+def test_slop_allows_that_many_words_in_between(manager, slop, expected):
+    assert _ids(manager, manager.phrase_rows("neural network", slop=slop)) == expected
+
+
+def test_terms_must_appear_in_order(manager):
+    assert "reversed" not in _ids(manager, manager.phrase_rows("neural network", slop=5))
+    assert _ids(manager, manager.phrase_rows("network neural")) == {"reversed"}
+
+
+def test_search_clauses_filter_and_alternatives_union(manager):
+    results = manager.search("training", 10, "bm25", phrases=["neural network"])
+    assert [content.id for content, _ in results] == ["exact"]
+
+    either = manager.search("training", 10, "bm25", phrases=[["neural network", "network neural"]])
+    assert {content.id for content, _ in either} == {"exact", "reversed"}
+    assert not manager.search("training", 10, "bm25", phrases=["neural network", "network neural"])
+
+
+def test_phrase_rows_match_a_brute_force_scan():
+    rng = random.Random(0)
+    words = ["alpha", "beta", "gamma", "delta", "omega"]
+    texts = [[rng.choice(words) for _ in range(rng.randint(2, 15))] for _ in range(300)]
+    manager = VectorDBManager(positional=True)
+    manager.add_contents([_doc(f"d{i}", " ".join(text)) for i, text in enumerate(texts)])
+
+    def brute(terms, slop):
+        hits = set()
+        for i, text in enumerate(texts):
+            for start, word in enumerate(text):
+                if word != terms[0]:
+                    continue
+                # greedy earliest-next matching, as a phrase with slop is defined
+                position, spare = start, slop
+                for term in terms[1:]:
+                    following = [p for p in range(position + 1, len(text)) if text[p] == term]
+                    if not following or following[0] - position - 1 > spare:
+                        break
+                    spare -= following[0] - position - 1
+                    position = following[0]
+                else:
+                    hits.add(f"d{i}")
+        return hits
+
+    for phrase in ("alpha beta", "gamma delta omega", "beta beta"):
+        for slop in (0, 1, 3):
+            assert _ids(manager, manager.phrase_rows(phrase, slop=slop)) == brute(phrase.split(), slop), (phrase, slop)
+
+
+def test_phrase_queries_need_a_positional_index():
+    manager = VectorDBManager()
+    manager.add_contents(DOCS)
+    with pytest.raises(RuntimeError):
+        manager.phrase_rows("neural network")
@@ -0,0 +1,35 @@
+import random
+import time
+
+from Project import LearningContent, VectorDBManager
+
+
+def _corpus(count, seed=0):
+    rng = random.Random(seed)
+    words = ["machine", "learning", "python", "data", "model", "intro"] + [f"w{i}" for i in range(200)]
+
+    def text(n):
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    return [
+        LearningContent(
+            id=f"c{i}", title=text(6), content_type="article", source="docs", url=f"https://example.org/{i}",
+            description=f"machine {text(3)} learning {text(30)}", difficulty="beginner", duration_minutes=10,
+        )
+        for i in range(count)
+    ]
+
+
+def test_phrase_query_stops_at_the_deadline():
+    manager = VectorDBManager(positional=True)
+    manager.add_contents(_corpus(5000))
+    full = manager.search("machine learning", 10, "hybrid", phrases=["machine learning"], slop=4)
+    assert not full.approximate
+
+    start = time.perf_counter()
+    cut = manager.search("machine learning", 10, "hybrid", phrases=["machine learning"], slop=4, deadline_ms=5)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    assert cut.approximate
+    assert elapsed_ms < 10 * 5
+    assert cut.total <= full.total
@@ -0,0 +1,84 @@
+from dataclasses import replace
+
+import numpy as np
+
+from dke import CATConfig, CATEngine, Item, ItemBank, ThetaGridIndex
+
+
+def _bank(count, seed=0, skills=1):
+    rng = np.random.default_rng(seed)
+    return ItemBank({
+        f"i{j}": Item(f"i{j}", f"s{j % skills}", float(rng.uniform(0.5, 2.0)), float(rng.normal(0, 1.2)), "")
+        for j in range(count)
+    })
+
+
+def _exact(bank, theta, mask, rows=None):
+    rows = np.arange(len(bank)) if rows is None else rows
+    a, b = bank.a[rows], bank.b[rows]
+    p = 1.0 / (1.0 + np.exp(-a * (theta - b)))
+    return int(rows[np.argmax(np.where(mask[rows], -np.inf, a * a * p * (1 - p)))])
+
+
+def _random_mask(size, asked, rng):
+    mask = np.zeros(size, dtype=bool)
+    mask[rng.choice(size, asked, replace=False)] = True
+    return mask
+
+
+def test_select_at_grid_points_matches_scoring_the_bank():
+    bank = _bank(1000)
+    index = ThetaGridIndex(bank)
+    rng = np.random.default_rng(1)
+    for theta in index.grid[::3]:
+        mask = _random_mask(len(bank), 25, rng)
+        assert index.select(theta, mask, 25) == _exact(bank, theta, mask)
+
+
+def test_appended_items_are_merged_like_a_fresh_build():
+    bank = _bank(400, seed=2)
+    index = ThetaGridIndex(bank)
+    for item in _bank(150, seed=3).all():
+        bank.add(Item("new-" + item.id, item.skill, item.a, item.b, ""))
+    fresh = ThetaGridIndex(bank)
+    index.refresh()
+
+    np.testing.assert_array_equal(index._info, fresh._info)
+    mask = np.zeros(len(bank), dtype=bool)
+    for theta in (-3.0, 0.0, 2.5):
+        assert index.select(theta, mask, 0) == fresh.select(theta, mask, 0) == _exact(bank, theta, mask)
+
+
+def test_replacing_an_item_rebuilds_the_lists():
+    bank = _bank(200, seed=4)
+    index = ThetaGridIndex(bank)
+    bank.add(Item("i5", "s0", 4.0, 1.0, "now the sharpest item at theta 1"))
+
+    assert index.select(1.0, np.zeros(len(bank), dtype=bool), 0) == bank.row_of["i5"]
+
+
+def test_interpolation_and_skill_lists_stay_close_to_exact_selection():
+    bank = _bank(2000, seed=5, skills=4)
+    index = ThetaGridIndex(bank, interpolate=True)
+    rng = np.random.default_rng(6)
+    agree = 0
+    for _ in range(200):
+        theta = float(rng.uniform(-3, 3))
+        mask = _random_mask(len(bank), 10, rng)
+        agree += index.select(theta, mask, 10) == _exact(bank, theta, mask)
+        rows = bank.skill_rows("s2")
+        chosen = index.select(theta, mask, int(mask[rows].sum()), skill=bank.skill_vocab["s2"])
+        assert chosen in rows and not mask[chosen]
+    assert agree >= 190
+
+
+def test_engine_with_an_interpolated_index_asks_the_same_items():
+    bank = _bank(800, seed=7)
+    config = CATConfig(max_items=15, se_stop=0.0, estimator="eap")
+    plain = CATEngine(bank, config)
+    indexed = CATEngine(bank, replace(config, info_index=True, grid_step=0.05, grid_interpolate=True))
+
+    def oracle(item):
+        return int(item.b < 0.4)
+
+    assert indexed.run(oracle).asked == plain.run(oracle).asked
@@ -12,6 +12,7 @@ Full-stack web application integrating:
 from flask import Flask, request, jsonify, session
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm.exc import StaleDataError
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import secrets
@@ -21,14 +22,14 @@ import os
 # Add parent directory to path for DKE imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from dke import DKEPipeline, CATConfig, BKTParams, SelfAssessment, _build_demo_bank, _simulate_student
+from dke import DKEPipeline, CATConfig, CATState, BKTParams, OpeningTree, SelfAssessment, _build_demo_bank, _simulate_student
 from dke_content_integration import AdaptiveLearningPipeline, create_demo_content
-from Project import UserProfile as DKEUserProfile
+from Project import UserProfile as DKEUserProfile, LearnedReRanker
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = secrets.token_hex(32)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///learning_platform.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URI', 'sqlite:///learning_platform.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SESSION_COOKIE_SECURE'] = False  # Set True in production with HTTPS
@@ -43,12 +44,22 @@ db = SQLAlchemy(app)
 bank, skills = _build_demo_bank()
 dke_pipeline = DKEPipeline(
     bank=bank,
-    cat_cfg=CATConfig(max_items=10, se_stop=0.35),
+    cat_cfg=CATConfig(max_items=10, se_stop=0.35, estimator='eap'),
     skills=skills,
     bkt_params=BKTParams(p_init=0.3, p_transit=0.25)
 )
 adaptive_pipeline = AdaptiveLearningPipeline(dke_pipeline=dke_pipeline)
 
+# Learning-to-rank weights trained offline are loaded once at startup
+ranker_model = os.environ.get('LEARNORA_RANKER_MODEL')
+if ranker_model and os.path.exists(ranker_model):
+    adaptive_pipeline.discovery.reranker = LearnedReRanker.load(ranker_model)
+
+# Opening CAT items are identical for every session; precompute them once per bank
+cat_opening = os.environ.get('LEARNORA_CAT_OPENING')
+if cat_opening:
+    dke_pipeline.cat.opening = OpeningTree.load_or_build(cat_opening, bank, dke_pipeline.cat.cfg, depth=4)
+
 # Add demo content
 demo_content = create_demo_content()
 if demo_content:
@@ -157,6 +168,23 @@ class Assessment(db.Model):
         }
 
 
+class AssessmentSession(db.Model):
+    """In-progress step-wise CAT session (serialized CATState)
+
+    Updates are conditional on ``version`` (bumped on every write), so of two
+    concurrent answers only the first is stored; the other raises StaleDataError.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    state = db.Column(db.Text, nullable=False)  # JSON from CATState.to_dict
+    completed = db.Column(db.Boolean, default=False)
+    version = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __mapper_args__ = {'version_id_col': version}
+
+
 # =====================
 # Authentication Routes
 # =====================
@@ -311,6 +339,83 @@ def get_chat_history():
 # Assessment Routes
 # =====================
 
+def _assess_and_recommend(user, oracle=None, cat_state=None):
+    """Score a CAT run (simulated via oracle, or a finished step-wise session)
+    and build content recommendations for the user."""
+    # Create user profile for DKE
+    user_profile = DKEUserProfile(
+        user_id=str(user.id),
+        preferred_formats=user.preferred_formats.split(',') if user.preferred_formats else [],
+        learning_goals=user.learning_goals.split(',') if user.learning_goals else [],
+        available_time_daily=user.available_time_daily
+    )
+    
+    self_assess = SelfAssessment(confidence={"algebra": 2, "probability": 3, "functions": 3})
+    
+    return adaptive_pipeline.run_assessment_and_recommend(
+        user_id=str(user.id),
+        response_free_text="I understand basic algebra concepts.",
+        reference_text="Algebra involves variables and equations.",
+        self_assess=self_assess,
+        concept_edges=[("variable", "equation")],
+        required_edges=[("variable", "equation"), ("equation", "solution")],
+        oracle=oracle,
+        user_profile=user_profile,
+        context="mathematics",
+        cat_state=cat_state
+    )
+
+
+def _save_assessment(user_id, bundle):
+    """Persist an assessment bundle (and its learning path); return the response payload."""
+    import json
+    assessment = Assessment(
+        user_id=user_id,
+        theta=bundle.assessment_summary['theta'],
+        mastery_scores=json.dumps(bundle.assessment_summary['mastery_scores']),
+        learning_gaps=json.dumps([{
+            'skill': gap.skill,
+            'mastery_level': gap.mastery_level,
+            'priority': gap.priority,
+            'recommended_difficulty': gap.recommended_difficulty
+        } for gap in bundle.learning_gaps])
+    )
+    db.session.add(assessment)
+    
+    # Create learning path from recommendations
+    if bundle.recommended_content:
+        learning_path = LearningPath(
+            user_id=user_id,
+            title=f"Learning Path - {datetime.now().strftime('%Y-%m-%d')}",
+            description=f"Personalized path based on assessment",
+            content_items=json.dumps(bundle.learning_path),
+            estimated_time=bundle.estimated_completion_time
+        )
+        db.session.add(learning_path)
+    
+    db.session.commit()
+    
+    return {
+        'assessment': {
+            'theta': bundle.assessment_summary['theta'],
+            'mastery_scores': bundle.assessment_summary['mastery_scores'],
+            'learning_gaps': [{
+                'skill': gap.skill,
+                'mastery_level': gap.mastery_level,
+                'priority': gap.priority,
+                'recommended_difficulty': gap.recommended_difficulty,
+                'estimated_study_time': gap.estimated_study_time
+            } for gap in bundle.learning_gaps],
+            'recommended_content': bundle.recommended_content
+        }
+    }
+
+
+def _item_payload(item):
+    """Public view of a CAT item (never includes the answer key)."""
+    return {'id': item.id, 'skill': item.skill, 'text': item.text, 'choices': item.choices}
+
+
 @app.route('/api/assessment/start', methods=['POST'])
 def start_assessment():
     """Start a new DKE assessment"""
@@ -321,81 +426,137 @@ def start_assessment():
     try:
         user = User.query.get(user_id)
         
-        # Create user profile for DKE
-        user_profile = DKEUserProfile(
-            user_id=str(user_id),
-            preferred_formats=user.preferred_formats.split(',') if user.preferred_formats else [],
-            learning_goals=user.learning_goals.split(',') if user.learning_goals else [],
-            available_time_daily=user.available_time_daily
-        )
-        
         # Simulate student for demo (in production, use actual quiz responses)
         theta_true = 0.0  # Average ability
         oracle = _simulate_student(theta_true, bank)
         
-        # Run assessment
-        self_assess = SelfAssessment(confidence={"algebra": 2, "probability": 3, "functions": 3})
-        
-        bundle = adaptive_pipeline.run_assessment_and_recommend(
-            user_id=str(user_id),
-            response_free_text="I understand basic algebra concepts.",
-            reference_text="Algebra involves variables and equations.",
-            self_assess=self_assess,
-            concept_edges=[("variable", "equation")],
-            required_edges=[("variable", "equation"), ("equation", "solution")],
-            oracle=oracle,
-            user_profile=user_profile,
-            context="mathematics"
-        )
-        
-        # Save assessment
-        import json
-        assessment = Assessment(
-            user_id=user_id,
-            theta=bundle.assessment_summary['theta'],
-            mastery_scores=json.dumps(bundle.assessment_summary['mastery_scores']),
-            learning_gaps=json.dumps([{
-                'skill': gap.skill,
-                'mastery_level': gap.mastery_level,
-                'priority': gap.priority,
-                'recommended_difficulty': gap.recommended_difficulty
-            } for gap in bundle.learning_gaps])
-        )
-        db.session.add(assessment)
-        
-        # Create learning path from recommendations
-        if bundle.recommended_content:
-            learning_path = LearningPath(
-                user_id=user_id,
-                title=f"Learning Path - {datetime.now().strftime('%Y-%m-%d')}",
-                description=f"Personalized path based on assessment",
-                content_items=json.dumps(bundle.learning_path),
-                estimated_time=bundle.estimated_completion_time
-            )
-            db.session.add(learning_path)
-        
-        db.session.commit()
-        
-        return jsonify({
-            'assessment': {
-                'theta': bundle.assessment_summary['theta'],
-                'mastery_scores': bundle.assessment_summary['mastery_scores'],
-                'learning_gaps': [{
-                    'skill': gap.skill,
-                    'mastery_level': gap.mastery_level,
-                    'priority': gap.priority,
-                    'recommended_difficulty': gap.recommended_difficulty,
-                    'estimated_study_time': gap.estimated_study_time
-                } for gap in bundle.learning_gaps],
-                'recommended_content': bundle.recommended_content
-            }
-        }), 200
+        bundle = _assess_and_recommend(user, oracle=oracle)
+        return jsonify(_save_assessment(user_id, bundle)), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/assessment/session', methods=['POST'])
+def start_assessment_session():
+    """Start a step-wise adaptive test and return its first item"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    import json
+    cat = dke_pipeline.cat
+    state = cat.start_session()
+    item = cat.next_item(state)
+    cat_session = AssessmentSession(user_id=user_id, state=json.dumps(state.to_dict(bank)))
+    db.session.add(cat_session)
+    db.session.commit()
+    
+    return jsonify({
+        'session_id': cat_session.id,
+        'item': _item_payload(item) if item else None,
+        'answered': 0,
+        'max_items': cat.cfg.max_items
+    }), 201
+
+
+@app.route('/api/assessment/session/<int:session_id>', methods=['GET'])
+def get_assessment_session(session_id):
+    """Resume a session: current item and ability estimate"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    import json
+    cat_session = AssessmentSession.query.filter_by(id=session_id, user_id=user_id).first()
+    if not cat_session:
+        return jsonify({'error': 'Assessment session not found'}), 404
+    
+    stored = json.loads(cat_session.state)
+    state = CATState.from_dict(stored, bank)
+    item = None if cat_session.completed else dke_pipeline.cat.next_item(state)
+    if item is not None and stored['pending'] is None:  # a new item was drawn
+        cat_session.state = json.dumps(state.to_dict(bank))
+        try:
+            db.session.commit()
+        except StaleDataError:
+            db.session.rollback()
+            return jsonify({'error': 'Assessment session was updated concurrently, retry'}), 409
+    
+    return jsonify({
+        'session_id': cat_session.id,
+        'completed': cat_session.completed,
+        'item': _item_payload(item) if item else None,
+        'answered': len(state.asked),
+        'theta': state.theta,
+        'theta_se': state.se if state.se != float('inf') else None
+    }), 200
+
+
+@app.route('/api/assessment/session/<int:session_id>/answer', methods=['POST'])
+def answer_assessment_session(session_id):
+    """Submit the answer to the pending item; returns the next item or the final assessment"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    import json
+    cat_session = AssessmentSession.query.filter_by(id=session_id, user_id=user_id).first()
+    if not cat_session:
+        return jsonify({'error': 'Assessment session not found'}), 404
+    if cat_session.completed:
+        return jsonify({'error': 'Assessment session already completed'}), 409
+    
+    data = request.get_json() or {}
+    if 'item_id' not in data:
+        return jsonify({'error': 'Provide item_id'}), 400
+    cat = dke_pipeline.cat
+    state = CATState.from_dict(json.loads(cat_session.state), bank)
+    if state.pending is None:
+        return jsonify({'error': 'No item awaiting an answer'}), 409
+    if data['item_id'] != state.pending:
+        return jsonify({'error': 'Answer is for an item that is no longer pending',
+                        'pending_item_id': state.pending}), 409
+    
+    item = bank.items[state.pending]
+    if 'choice' in data and item.correct_index is not None:
+        correct = int(data['choice'] == item.correct_index)
+    elif 'correct' in data:
+        correct = int(bool(data['correct']))
+    else:
+        return jsonify({'error': 'Provide choice or correct'}), 400
+    
+    try:
+        cat.submit(state, correct)
+        next_item = cat.next_item(state)
+        cat_session.state = json.dumps(state.to_dict(bank))
+        
+        if next_item is not None:
+            db.session.commit()
+            return jsonify({
+                'session_id': cat_session.id,
+                'completed': False,
+                'item': _item_payload(next_item),
+                'answered': len(state.asked),
+                'theta': state.theta,
+                'theta_se': state.se if state.se != float('inf') else None
+            }), 200
+        
+        cat_session.completed = True
+        bundle = _assess_and_recommend(User.query.get(user_id), cat_state=state)
+        payload = _save_assessment(user_id, bundle)
+        payload.update({'session_id': cat_session.id, 'completed': True, 'answered': len(state.asked)})
+        return jsonify(payload), 200
+    
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Assessment session was updated concurrently, retry'}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/assessment/history', methods=['GET'])
 def get_assessment_history():
     """Get assessment history"""
@@ -499,6 +660,61 @@ def update_learning_path_progress(path_id):
         return jsonify({'error': str(e)}), 500
 
 
+# =====================
+# Search Routes
+# =====================
+
+@app.route('/api/search', methods=['GET'])
+def search_content():
+    """Search indexed content, with facet counts over the whole match set"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    query = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    deadline_ms = request.args.get('deadline_ms', type=float)
+    
+    results = adaptive_pipeline.discovery.vector_db.search(
+        query,
+        top_k=limit,
+        facets=['difficulty', 'content_type', 'source', 'tags'],
+        facet_limit=20,
+        deadline_ms=deadline_ms
+    )
+    return jsonify({
+        'query': query,
+        'total': results.total,
+        'results': [{
+            'id': content.id,
+            'title': content.title,
+            'content_type': content.content_type,
+            'source': content.source,
+            'difficulty': content.difficulty,
+            'duration_minutes': content.duration_minutes,
+            'url': content.url,
+            'tags': content.tags,
+            'score': round(score, 4)
+        } for content, score in results],
+        'facets': results.facets,
+        'approximate': results.approximate
+    }), 200
+
+
+@app.route('/api/search/suggest', methods=['GET'])
+def search_suggest():
+    """Typeahead completions for terms and content titles"""
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    prefix = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 8, type=int), 1), 25)
+    
+    suggestions = adaptive_pipeline.discovery.vector_db.suggest(prefix, limit=limit)
+    return jsonify(suggestions), 200
+
+
 # =====================
 # Utility Functions
 # =====================